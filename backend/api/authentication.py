@@ -0,0 +1,75 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .metrics import count_cache
+
+TOKEN_TIMEOUT = 5 * 60
+# Сброшенную запись нельзя заполнить заново, пока не завершатся
+# запросы, начавшие проверку токена до сброса.
+REVOKED_TIMEOUT = 30
+REVOKED = 'revoked'
+# Не попадают в кеш; при обращении загружаются из базы.
+SECRET_FIELDS = ('password',)
+
+User = get_user_model()
+
+
+def token_cache_key(key):
+    return f'auth:token:v2:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def forget_tokens(keys):
+    """Сбрасывает закешированных пользователей по ключам токенов."""
+    keys = list(keys)
+    if keys:
+        cache.set_many(
+            {token_cache_key(key): REVOKED for key in keys}, REVOKED_TIMEOUT
+        )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, которая берет токен с пользователем из кеша.
+
+    В кеше лежат значения полей пользователя без хеша пароля
+    (SECRET_FIELDS) и дата создания токена. Запись живет не дольше
+    TOKEN_TIMEOUT и сбрасывается сигналами при выходе, изменении
+    и удалении пользователя; размер ограничен вытеснением самого кеша.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        cached = token is not None and token != REVOKED
+        count_cache('token', cached, not cached)
+        if not cached:
+            user, token = super().authenticate_credentials(key)
+            cache.add(cache_key, (
+                {
+                    field.attname: getattr(user, field.attname)
+                    for field in User._meta.concrete_fields
+                    if field.name not in SECRET_FIELDS
+                },
+                token.created,
+            ), TOKEN_TIMEOUT)
+            return user, token
+        values, created = token
+        user = User.from_db(
+            DEFAULT_DB_ALIAS, list(values), list(values.values())
+        )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        token = Token.from_db(
+            DEFAULT_DB_ALIAS, ['key', 'user_id', 'created'],
+            [key, user.pk, created]
+        )
+        token.user = user
+        return user, token
@@ -0,0 +1,172 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.versions import (INGREDIENTS_VERSION, RECIPE_LIST_VERSION,
+                           TAGS_VERSION, bump_versions, get_versions,
+                           recipe_version_key, user_flags_version_key)
+from recipes.models import Recipe
+
+from .metrics import count_cache
+
+# Запись считается свежей FRESH_TIMEOUT секунд; после этого ее
+# перестраивает один воркер, остальные отдают устаревшую копию.
+FRESH_TIMEOUT = 60
+RESPONSE_TIMEOUT = 60 * 10
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+WAIT_ATTEMPTS = 20
+
+
+def etag_matches(request, etag):
+    """Проверяет заголовок If-None-Match запроса."""
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in (tag.strip() for tag in header.split(',')) or header == '*'
+
+
+def invalidate_recipes(recipe_ids):
+    """Сбрасывает кеш деталей рецептов и всех списков."""
+    keys = [recipe_version_key(recipe_id) for recipe_id in recipe_ids]
+    if keys:
+        bump_versions(RECIPE_LIST_VERSION, *keys)
+
+
+def normalize_query(request):
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+    )
+    raw = f'{request.get_host()}?{urlencode(params)}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def recipe_list_key(request, **kwargs):
+    version, = get_versions(RECIPE_LIST_VERSION)
+    return f'recipes:list:{version}:{normalize_query(request)}'
+
+
+def recipe_detail_key(request, pk=None, **kwargs):
+    if str(pk).isdigit():
+        pk = int(pk)
+    version, = get_versions(recipe_version_key(pk))
+    return f'recipes:detail:{pk}:{version}:{normalize_query(request)}'
+
+
+def _rebuild(key, lock_key, build):
+    try:
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                key, (response.data, time.time() + FRESH_TIMEOUT),
+                RESPONSE_TIMEOUT
+            )
+        return response
+    finally:
+        cache.delete(lock_key)
+
+
+def cached_response(key, build):
+    """Отдает ответ из кеша, перестраивая его не более чем одним
+    воркером одновременно."""
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    count_cache('response', entry is not None, entry is None)
+    if entry is not None:
+        data, fresh_until = entry
+        if (fresh_until > time.time()
+                or not cache.add(lock_key, 1, LOCK_TIMEOUT)):
+            return Response(data)
+        return _rebuild(key, lock_key, build)
+
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        for _ in range(WAIT_ATTEMPTS):
+            time.sleep(WAIT_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return Response(entry[0])
+        return build()
+    return _rebuild(key, lock_key, build)
+
+
+def cache_anonymous_response(key_func):
+    """Кеширует ответ действия вьюсета для анонимных пользователей."""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not request.user.is_anonymous:
+                return method(self, request, *args, **kwargs)
+            return cached_response(
+                key_func(request, **kwargs),
+                lambda: method(self, request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+def conditional_response(validators, vary=()):
+    """Отвечает 304 на условный запрос, не выполняя действие.
+
+    validators(request, **kwargs) возвращает (etag, last_modified)
+    по версиям в кеше, не трогая тело ответа.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = validators(request, **kwargs)
+            timestamp = None
+            if last_modified is not None:
+                timestamp = int(last_modified.timestamp())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            if etag is not None:
+                response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            if vary:
+                patch_vary_headers(response, vary)
+            return response
+        return wrapper
+    return decorator
+
+
+def tag_validators(request, pk=None, **kwargs):
+    version, = get_versions(TAGS_VERSION)
+    return f'"{version}-{pk or "list"}"', None
+
+
+def ingredient_validators(request, pk=None, **kwargs):
+    version, = get_versions(INGREDIENTS_VERSION)
+    return f'"{version}-{pk}"', None
+
+
+def recipe_detail_validators(request, pk=None, **kwargs):
+    """ETag зависит от версии рецепта и, для авторизованных, от версии
+    их избранного, корзины и подписок."""
+    if not str(pk).isdigit():
+        return None, None
+    pk = int(pk)
+    if request.user.is_anonymous:
+        version, = get_versions(recipe_version_key(pk))
+        last_modified = Recipe.objects.filter(pk=pk).values_list(
+            'updated_at', flat=True
+        ).first()
+        return f'"{version}-anon"', last_modified
+    version, flags = get_versions(
+        recipe_version_key(pk), user_flags_version_key(request.user.id)
+    )
+    return f'"{version}-{flags}"', None
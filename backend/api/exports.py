@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+
+PDF_FONT_NAME = 'ShoppingListFont'
+CHUNK_SIZE = 64 * 1024
+
+
+def export_txt(rows, today):
+    yield f'{today}\nСписок покупок:\n'
+    for name, unit, amount in rows:
+        yield f'\n{name} ({unit}) - {amount}'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_csv(rows, today):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_json(rows, today):
+    yield f'{{"date": "{today}", "ingredients": ['
+    separator = ''
+    for name, unit, amount in rows:
+        item = json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False
+        )
+        yield f'{separator}{item}'
+        separator = ', '
+    yield ']}'
+
+
+def pdf_font():
+    """Шрифт с кириллицей из настроек, регистрируется один раз."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    if font_path and os.path.exists(font_path):
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+        return PDF_FONT_NAME
+    return 'Helvetica'
+
+
+def export_pdf(rows, today):
+    """Рендерит PDF в потоке запроса.
+
+    Строки читаются из курсора по мере отрисовки, без списка в памяти.
+    reportlab собирает файл только в save(), поэтому отдается он
+    кусками уже после рендеринга.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    font = pdf_font()
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    y = height - 60
+    pdf.setFont(font, 16)
+    pdf.drawString(50, y, f'Список покупок на {today}')
+    pdf.setFont(font, 12)
+    y -= 30
+    for name, unit, amount in rows:
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = height - 50
+        pdf.drawString(50, y, f'{name} ({unit}) - {amount}')
+        y -= 18
+    pdf.save()
+    content = buffer.getbuffer()
+    for start in range(0, len(content), CHUNK_SIZE):
+        yield bytes(content[start:start + CHUNK_SIZE])
+
+
+# формат: (генератор, content type)
+EXPORTS = {
+    'txt': (export_txt, 'text/plain; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'json': (export_json, 'application/json'),
+    'pdf': (export_pdf, 'application/pdf'),
+}
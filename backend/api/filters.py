@@ -1,6 +1,7 @@
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
+from recipes.fulltext import search_recipes
 from recipes.models import Tag
 from users.models import User
 
@@ -24,13 +25,23 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.CharFilter(
         method='get_is_in_shopping_cart',
     )
+    search = filters.CharFilter(
+        method='get_search',
+    )
 
     def get_is_favorited(self, queryset, filter_name, filter_value):
         if filter_value:
-            return queryset.filter(favorite_recipe__user=self.request.user)
+            return queryset.with_user_flags(self.request.user).filter(
+                is_favorited=True
+            )
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, filter_name, filter_value):
         if filter_value:
-            return queryset.filter(shopping_cart__user=self.request.user)
+            return queryset.with_user_flags(self.request.user).filter(
+                is_in_shopping_cart=True
+            )
         return queryset
+
+    def get_search(self, queryset, filter_name, filter_value):
+        return search_recipes(queryset, filter_value)
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+
+from core.versions import get_versions, recipe_version_key
+from recipes.models import Recipe
+
+from .metrics import count_cache
+from .readers import read_recipes
+from .serializers import RecipeRetriveSerializer
+
+FRAGMENT_TIMEOUT = 60 * 60
+
+
+def fragment_key(recipe_id, version, request):
+    return f'recipes:fragment:{recipe_id}:{version}:{request.get_host()}'
+
+
+def serialize_recipes(recipe_ids, request):
+    """Представления рецептов для анонимного пользователя."""
+    if settings.FAST_READ_SERIALIZERS:
+        return read_recipes(recipe_ids, request)
+    recipes = Recipe.objects.with_related().with_user_flags(
+        AnonymousUser()
+    ).filter(id__in=recipe_ids)
+    return RecipeRetriveSerializer(
+        recipes, many=True, context={'request': request}
+    ).data
+
+
+def render_fragments(recipe_ids, request):
+    """Возвращает общее для всех пользователей представление рецептов.
+
+    Отсутствующие в кеше фрагменты рендерятся одной выборкой
+    и кладутся в кеш пачкой.
+    """
+    versions = get_versions(
+        *(recipe_version_key(recipe_id) for recipe_id in recipe_ids)
+    )
+    keys = {
+        recipe_id: fragment_key(recipe_id, version, request)
+        for recipe_id, version in zip(recipe_ids, versions)
+    }
+    fragments = cache.get_many(keys.values())
+    missing = [
+        recipe_id for recipe_id, key in keys.items() if key not in fragments
+    ]
+    count_cache('fragment', len(fragments), len(missing))
+    if missing:
+        rendered = {
+            keys[item['id']]: item
+            for item in serialize_recipes(missing, request)
+        }
+        cache.set_many(rendered, FRAGMENT_TIMEOUT)
+        fragments.update(rendered)
+    return {
+        recipe_id: fragments[key]
+        for recipe_id, key in keys.items() if key in fragments
+    }
+
+
+def render_recipes(recipes, request):
+    """Собирает представления рецептов из кешированных фрагментов
+    и флагов текущего пользователя.
+
+    Рецепты должны быть выбраны через Recipe.objects.with_user_flags.
+    """
+    fragments = render_fragments([recipe.id for recipe in recipes], request)
+    data = []
+    for recipe in recipes:
+        if recipe.id not in fragments:
+            # Рецепт удален между выборкой страницы и рендерингом.
+            continue
+        item = dict(fragments[recipe.id])
+        item['author'] = dict(
+            item['author'], is_subscribed=recipe.author_is_subscribed
+        )
+        item['is_favorited'] = recipe.is_favorited
+        item['is_in_shopping_cart'] = recipe.is_in_shopping_cart
+        data.append(item)
+    return data
@@ -0,0 +1,231 @@
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import User
+
+BASELINE_PATH = os.path.join(settings.BASE_DIR, 'data/benchmark_baseline.json')
+
+# (название, URL, авторизация). {recipe} и {author} подставляются
+# после наполнения базы.
+ENDPOINTS = (
+    ('recipes-list', '/api/recipes/', False),
+    ('recipes-list-auth', '/api/recipes/', True),
+    ('recipes-list-deep', '/api/recipes/?page=50', False),
+    ('recipes-detail', '/api/recipes/{recipe}/', False),
+    ('recipes-detail-auth', '/api/recipes/{recipe}/', True),
+    ('recipes-filter-tags', '/api/recipes/?tags=breakfast&tags=lunch',
+     False),
+    ('recipes-filter-author', '/api/recipes/?author={author}', False),
+    ('recipes-filter-favorited', '/api/recipes/?is_favorited=1', True),
+    ('recipes-filter-cart', '/api/recipes/?is_in_shopping_cart=1', True),
+    ('recipes-download-shopping-cart',
+     '/api/recipes/download_shopping_cart/', True),
+    ('users-list', '/api/users/', False),
+    ('users-me', '/api/users/me/', True),
+    ('users-subscriptions', '/api/users/subscriptions/?recipes_limit=3',
+     True),
+    ('tags-list', '/api/tags/', False),
+    ('ingredients-list', '/api/ingredients/', False),
+    ('ingredients-search', '/api/ingredients/?name=мол', False),
+)
+
+
+def fetch(client, url):
+    """GET с чтением потокового ответа: без этого генератор выгрузки
+    не выполняется и его запросы не попадают в замер."""
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+class Command(BaseCommand):
+    """Замер числа SQL-запросов, задержки и памяти по эндпоинтам API.
+
+    Наполняет тестовую базу данными, прогоняет каждый эндпоинт и
+    сравнивает результат с базовой линией из JSON-файла.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--baseline', default=BASELINE_PATH)
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Перезаписать базовую линию текущими результатами.'
+        )
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=1.5,
+            help='Допустимый рост p95 относительно базовой линии.'
+        )
+        parser.add_argument(
+            '--latency-slack', type=float, default=5,
+            help='Рост p95 в мс, который не считается регрессией: '
+                 'у запросов в единицы мс разброс больше допуска.'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу после прогона.'
+        )
+
+    def handle(self, *args, **options):
+        baseline_path = options['baseline']
+        if not options['update_baseline'] and not os.path.exists(
+            baseline_path
+        ):
+            raise CommandError(
+                f'Нет базовой линии {baseline_path}, запустите команду '
+                'с --update-baseline.'
+            )
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            if not Recipe.objects.exists():
+                self.stdout.write('Наполнение базы...')
+                self.seed(options)
+            results = self.run_endpoints(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+
+        self.report(results)
+        if options['update_baseline']:
+            with open(baseline_path, 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+            self.stdout.write(
+                self.style.SUCCESS(f'Базовая линия записана: {baseline_path}')
+            )
+            return
+
+        with open(baseline_path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        errors = self.compare(
+            results, baseline, options['latency_tolerance'],
+            options['latency_slack']
+        )
+        if errors:
+            raise CommandError('Регрессия производительности:\n'
+                               + '\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Бюджеты не превышены.'))
+
+    def seed(self, options):
+        # Без счетчиков, лент и сводных списков эндпоинты работали бы
+        # не на тех данных, что в продакшене.
+        call_command(
+            'generate_data', users=options['users'],
+            recipes=options['recipes'], seed=options['seed'],
+            stdout=self.stdout
+        )
+
+    def run_endpoints(self, repeat):
+        user = (User.objects.filter(subscriber__isnull=False,
+                                    shopper__isnull=False)
+                .order_by('id').first())
+        token, _ = Token.objects.get_or_create(user=user)
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        anon = APIClient()
+        auth = APIClient()
+        auth.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        results = {}
+        for name, url, authorized in ENDPOINTS:
+            url = url.format(recipe=recipe.id, author=recipe.author_id)
+            client = auth if authorized else anon
+
+            # Холодный запрос: кеш ответов, фрагментов и токенов пуст.
+            cache.clear()
+            cold_queries, cold_ms = self.measure(client, name, url)
+            warm_queries, _ = self.measure(client, name, url)
+
+            timings = []
+            for _ in range(repeat):
+                timings.append(self.measure(client, name, url)[1])
+
+            tracemalloc.start()
+            fetch(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            quantiles = statistics.quantiles(timings, n=20)
+            results[name] = {
+                'url': url,
+                'cold_queries': cold_queries,
+                'cold_ms': round(cold_ms, 2),
+                'queries': warm_queries,
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(quantiles[-1], 2),
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+        return results
+
+    def measure(self, client, name, url):
+        """Число SQL-запросов и время одного запроса, мс."""
+        # Лог запросов сбрасывается сигналом request_started,
+        # поэтому очищаем его до замера.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = fetch(client, url)
+            spent = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            raise CommandError(f'{name}: {url} вернул {response.status_code}')
+        return len(queries), spent
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"эндпоинт":32} {"холодный":>9} {"мс":>8} {"запросы":>8} '
+            f'{"p50, мс":>9} {"p95, мс":>9} {"память, КБ":>11}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:32} {result["cold_queries"]:>9} '
+                f'{result["cold_ms"]:>8} {result["queries"]:>8} '
+                f'{result["p50_ms"]:>9} {result["p95_ms"]:>9} '
+                f'{result["peak_memory_kb"]:>11}'
+            )
+
+    def compare(self, results, baseline, tolerance, slack):
+        errors = []
+        for name, result in results.items():
+            budget = baseline.get(name)
+            if budget is None:
+                continue
+            for key, title in (
+                ('cold_queries', 'холодных запросов'),
+                ('queries', 'запросов'),
+            ):
+                if result[key] > budget.get(key, result[key]):
+                    errors.append(
+                        f'{name}: {result[key]} {title}, '
+                        f'бюджет {budget[key]}'
+                    )
+            if result['p95_ms'] > max(
+                budget['p95_ms'] * tolerance, budget['p95_ms'] + slack
+            ):
+                errors.append(
+                    f'{name}: p95 {result["p95_ms"]} мс, '
+                    f'бюджет {budget["p95_ms"]} мс x {tolerance}'
+                )
+        return errors
@@ -0,0 +1,108 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.readers import read_recipes
+from api.serializers import RecipeRetriveSerializer
+from recipes.models import Recipe
+
+BATCH_SIZE = 100
+
+
+def drf_recipes(recipe_ids, request):
+    recipes = Recipe.objects.with_related().with_user_flags(
+        AnonymousUser()
+    ).filter(id__in=recipe_ids)
+    return RecipeRetriveSerializer(
+        recipes, many=True, context={'request': request}
+    ).data
+
+
+def rendered(items):
+    """JSON каждого рецепта так, как его отдает API."""
+    renderer = JSONRenderer()
+    return {item['id']: renderer.render(item) for item in items}
+
+
+class Command(BaseCommand):
+    """Сверка быстрых представлений рецептов (api.readers) с
+    RecipeRetriveSerializer и замер ускорения.
+
+    JSON каждого рецепта должен совпадать побайтно; при расхождениях
+    команда завершается с ошибкой.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Сколько последних рецептов проверять (по умолчанию все).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Размер пачки, как у страницы списка.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз прогонять пачки для замера.'
+        )
+        parser.add_argument(
+            '--host', default=None,
+            help='Хост для абсолютных ссылок на картинки.'
+        )
+
+    def handle(self, *args, **options):
+        host = options['host'] or settings.ALLOWED_HOSTS[0].lstrip('.')
+        request = RequestFactory().get(
+            '/api/recipes/', HTTP_HOST='localhost' if host == '*' else host
+        )
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        if options['limit'] is not None:
+            recipe_ids = recipe_ids[:options['limit']]
+        size = options['batch_size']
+        batches = [
+            recipe_ids[start:start + size]
+            for start in range(0, len(recipe_ids), size)
+        ]
+
+        mismatches = 0
+        for batch in batches:
+            expected = rendered(drf_recipes(batch, request))
+            actual = rendered(read_recipes(batch, request))
+            for recipe_id in expected.keys() | actual.keys():
+                if expected.get(recipe_id) != actual.get(recipe_id):
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'Рецепт {recipe_id}:\n'
+                        f'  DRF:     {expected.get(recipe_id)}\n'
+                        f'  быстрый: {actual.get(recipe_id)}'
+                    ))
+
+        timings = {}
+        for name, serialize in (
+            ('DRF', drf_recipes), ('быстрый', read_recipes)
+        ):
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                for batch in batches:
+                    rendered(serialize(batch, request))
+            timings[name] = time.perf_counter() - start
+        total = options['repeat'] * len(recipe_ids) or 1
+        for name, spent in timings.items():
+            self.stdout.write(
+                f'{name:8} {spent * 1000:9.1f} мс, '
+                f'{spent * 1e6 / total:7.1f} мкс на рецепт'
+            )
+        if timings['быстрый']:
+            self.stdout.write(
+                f'Ускорение: x{timings["DRF"] / timings["быстрый"]:.1f}'
+            )
+
+        if mismatches:
+            raise CommandError(f'Расхождений с DRF: {mismatches}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Совпадают все рецепты: {len(recipe_ids)}.'
+        ))
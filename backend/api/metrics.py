@@ -0,0 +1,115 @@
+import hmac
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# Метрики воркеров gunicorn складываются в файлы каталога
+# PROMETHEUS_MULTIPROC_DIR; без него каждый процесс считает отдельно.
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+UNMATCHED = '<unmatched>'
+
+REQUESTS = Counter(
+    'foodgram_requests_total', 'Запросы по маршрутам.',
+    ['view', 'method', 'status']
+)
+LATENCY = Histogram(
+    'foodgram_request_duration_seconds', 'Время ответа по маршрутам.',
+    ['view', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+QUERIES = Histogram(
+    'foodgram_request_sql_queries', 'Число SQL-запросов на запрос.',
+    ['view', 'method'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200)
+)
+IN_FLIGHT = Gauge(
+    'foodgram_requests_in_flight', 'Запросы в обработке.',
+    multiprocess_mode='livesum'
+)
+CACHE = Counter(
+    'foodgram_cache_requests_total', 'Обращения к кешу по видам данных.',
+    ['cache', 'result']
+)
+
+
+def count_cache(name, hits, misses=0):
+    """Учитывает попадания и промахи кеша name."""
+    if hits:
+        CACHE.labels(name, 'hit').inc(hits)
+    if misses:
+        CACHE.labels(name, 'miss').inc(misses)
+
+
+def view_name(request):
+    """Имя маршрута роутера DRF, например recipes-favorite."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return UNMATCHED
+    return match.url_name
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Считает запросы, время ответа и число SQL-запросов по маршрутам."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(queries))
+                response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        view = view_name(request)
+        LATENCY.labels(view, request.method).observe(
+            time.perf_counter() - start
+        )
+        QUERIES.labels(view, request.method).observe(queries.count)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        return response
+
+
+def metrics_allowed(request):
+    """Метрики отдаются адресам из METRICS_ALLOWED_IPS или по токену
+    METRICS_TOKEN в заголовке Authorization: Bearer."""
+    if settings.METRICS_TOKEN and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(),
+        f'Bearer {settings.METRICS_TOKEN}'.encode()
+    ):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    """Метрики в формате Prometheus, собранные со всех воркеров."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
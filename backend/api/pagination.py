@@ -0,0 +1,127 @@
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class RecipePagination(PageNumberPagination):
+    """Пагинация ленты рецептов.
+
+    По умолчанию работает постранично (?page=N). Если в запросе есть
+    параметр cursor (для первой страницы - пустой), включается
+    keyset-пагинация по (pub_date, id): следующая страница выбирается
+    по индексу без OFFSET, поэтому глубокие страницы стоят столько же,
+    сколько первая. Параметр count=false отключает подсчет
+    общего числа рецептов. Результаты полнотекстового поиска
+    упорядочены по релевантности, а не по дате, и всегда
+    разбиваются постранично.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    limit_query_param = 'limit'
+    max_limit = 100
+    cursor_ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.cursor_query_param in request.query_params
+            and 'search_rank' not in queryset.query.annotations
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param) != 'false':
+            self.count = queryset.count()
+
+        queryset = queryset.order_by(*self.cursor_ordering)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        if position is not None:
+            pub_date, pk = position
+            # Условие pub_date <= позиции дает планировщику границу
+            # диапазона по индексу (pub_date, id): без него OR
+            # проверяется фильтром по всем строкам от самой новой.
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk),
+                pub_date__lte=pub_date
+            )
+        page = list(queryset[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        self.page = page[:self.limit]
+        return self.page
+
+    def paginate_keyset(self, fetch, request):
+        """Keyset-пагинация по произвольному источнику.
+
+        fetch(position, limit) возвращает рецепты после позиции
+        (pub_date, id) в порядке cursor_ordering.
+        """
+        self.use_cursor = True
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.count = None
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        page = fetch(position, self.limit + 1)
+        self.has_next = len(page) > self.limit
+        self.page = page[:self.limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(last.pub_date, last.id)
+        )
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(limit, 1), self.max_limit)
+
+    def encode_cursor(self, pub_date, pk):
+        value = f'{pub_date.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(value).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            pub_date, pk = value.split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from recipes.models import IngredientRecipe, Recipe, Tag
+
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'text', 'cooking_time', 'author_id',
+    'author__email', 'author__username', 'author__first_name',
+    'author__last_name',
+)
+TAG_FIELDS = ('recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug')
+INGREDIENT_FIELDS = (
+    'recipe_id', 'ingredient_id', 'ingredient__name',
+    'ingredient__measurement_unit', 'amount',
+)
+
+
+def image_url(request):
+    """Повторяет Base64ImageField.to_representation для картинок
+    рецептов."""
+    storage = Recipe._meta.get_field('image').storage
+    urls = {}
+
+    def url(name):
+        if not name:
+            return None
+        if name not in urls:
+            urls[name] = request.build_absolute_uri(storage.url(name))
+        return urls[name]
+    return url
+
+
+def read_recipes(recipe_ids, request):
+    """Представления рецептов для анонимного пользователя, побайтно
+    совпадающие с RecipeRetriveSerializer.
+
+    Строки берутся через values_list тремя запросами, как и в
+    with_related, но без моделей и полей DRF на каждый объект.
+    """
+    tags = defaultdict(list)
+    tag_data = {}
+    for recipe_id, tag_id, name, color, slug in (
+        Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by(
+            *(f'tag__{field}' for field in Tag._meta.ordering)
+        ).values_list(*TAG_FIELDS)
+    ):
+        if tag_id not in tag_data:
+            tag_data[tag_id] = {
+                'id': tag_id, 'name': name, 'color': color, 'slug': slug,
+            }
+        tags[recipe_id].append(tag_data[tag_id])
+
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, name, unit, amount in (
+        IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('id').values_list(*INGREDIENT_FIELDS)
+    ):
+        ingredients[recipe_id].append({
+            'id': ingredient_id, 'name': name,
+            'measurement_unit': unit, 'amount': amount,
+        })
+
+    url = image_url(request)
+    return [
+        {
+            'id': recipe_id,
+            'tags': tags[recipe_id],
+            'author': {
+                'email': email,
+                'id': author_id,
+                'username': username,
+                'first_name': first_name,
+                'last_name': last_name,
+                'is_subscribed': False,
+            },
+            'ingredients': ingredients[recipe_id],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': name,
+            'image': url(image),
+            'text': text,
+            'cooking_time': cooking_time,
+        }
+        for (
+            recipe_id, name, image, text, cooking_time, author_id,
+            email, username, first_name, last_name
+        ) in Recipe.objects.filter(
+            id__in=recipe_ids
+        ).order_by().values_list(*RECIPE_FIELDS)
+    ]
@@ -0,0 +1,139 @@
+import hashlib
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Как часто проверять реплику, секунд.
+CHECK_INTERVAL = 5
+PIN_KEY = 'db:pin:{}'
+# Общие данные (рецепты, теги, ингредиенты) недавно менялись:
+# пока реплика может отставать, кеши заполняются с primary.
+SHARED_PIN_KEY = 'db:pin:shared'
+# Токены читаются только с primary: только что выданный токен
+# мог еще не дойти до реплики.
+PRIMARY_APPS = {'authtoken', 'sessions', 'admin'}
+LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+    'END'
+)
+
+use_replica = ContextVar('use_replica', default=False)
+_health = {}
+_health_lock = threading.Lock()
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'postgresql':
+            cursor.execute('SELECT 1')
+            return 0
+        cursor.execute(LAG_SQL)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def is_healthy(alias):
+    try:
+        return replica_lag(alias) <= settings.DATABASE_REPLICA_MAX_LAG
+    except DatabaseError:
+        connections[alias].close()
+        return False
+
+
+def healthy_replicas():
+    """Реплики, которые отвечают и не отстают больше допустимого."""
+    now = time.monotonic()
+    result = []
+    for alias in settings.DATABASE_REPLICAS:
+        healthy, checked_at = _health.get(alias, (False, None))
+        if checked_at is None or now - checked_at > CHECK_INTERVAL:
+            with _health_lock:
+                healthy = is_healthy(alias)
+                _health[alias] = (healthy, now)
+        if healthy:
+            result.append(alias)
+    return result
+
+
+def client_key(request):
+    """Ключ клиента для закрепления за primary: токен или сессия."""
+    credentials = request.META.get('HTTP_AUTHORIZATION') or (
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    return PIN_KEY.format(hashlib.sha256(credentials.encode()).hexdigest())
+
+
+def pin_shared_reads():
+    cache.set(SHARED_PIN_KEY, 1, settings.DATABASE_REPLICA_PIN_TIMEOUT)
+
+
+def is_pinned(request):
+    keys = [SHARED_PIN_KEY]
+    key = client_key(request)
+    if key is not None:
+        keys.append(key)
+    return bool(cache.get_many(keys))
+
+
+class ReplicaMiddleware:
+    """Отправляет безопасные запросы к вьюсетам с read_from_replica
+    на реплики.
+
+    После успешной записи клиент на DATABASE_REPLICA_PIN_TIMEOUT секунд
+    закрепляется за primary, чтобы видеть свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            key = client_key(request)
+            if key is not None:
+                cache.set(key, 1, settings.DATABASE_REPLICA_PIN_TIMEOUT)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', None)
+        if (request.method in SAFE_METHODS
+                and settings.DATABASE_REPLICAS
+                and getattr(view, 'read_from_replica', False)
+                and not is_pinned(request)):
+            use_replica.set(True)
+
+
+class ReplicaRouter:
+    """Чтение внутри запроса, помеченного ReplicaMiddleware, идет на
+    случайную здоровую реплику; запись - всегда на primary."""
+
+    def db_for_read(self, model, **hints):
+        if not use_replica.get() or model._meta.app_label in PRIMARY_APPS:
+            return None
+        replicas = healthy_replicas()
+        if not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Без явного ответа Django пишет в базу, из которой прочитан
+        # объект, то есть в реплику.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
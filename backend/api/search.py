@@ -0,0 +1,133 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+
+from core.versions import INGREDIENTS_VERSION, get_versions
+from recipes.models import Ingredient
+
+
+# Порог и размер выдачи нечеткого поиска.
+FUZZY_THRESHOLD = 0.5
+FUZZY_LIMIT = 20
+
+WORD_RE = re.compile(r'\w+')
+# Грубая фонетическая свертка: безударные о/а и е/и путают чаще
+# всего, поэтому в n-граммах они не различаются.
+PHONETIC = str.maketrans({
+    'о': 'а', 'я': 'а', 'ё': 'и', 'е': 'и', 'э': 'и', 'ы': 'и', 'й': 'и',
+    'ю': 'у', 'ъ': None, 'ь': None,
+})
+
+
+def fold(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+def trigrams(value):
+    """Множество триграмм как в pg_trgm: каждое слово дополняется
+    двумя пробелами слева и одним справа."""
+    result = set()
+    for word in WORD_RE.findall(fold(value).translate(PHONETIC)):
+        word = f'  {word} '
+        result.update(word[i:i + 3] for i in range(len(word) - 2))
+    return result
+
+
+Snapshot = namedtuple('Snapshot', 'keys items trigrams postings')
+EMPTY = Snapshot((), (), (), {})
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса.
+
+    Хранит отсортированный список приведенных к нижнему регистру
+    названий и отвечает на поиск по префиксу бинарным поиском, не
+    обращаясь к базе. Перестраивается, когда меняется общая для всех
+    воркеров версия в кеше.
+
+    Данные лежат в одном неизменяемом снимке, который заменяется
+    целиком: читатели без блокировки видят либо старый, либо новый
+    индекс, но не их смесь.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.snapshot = EMPTY
+        self.lock = threading.Lock()
+
+    def build(self):
+        rows = sorted(
+            (fold(name), name, pk, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        grams = tuple(frozenset(trigrams(name)) for _, name, _, _ in rows)
+        postings = defaultdict(list)
+        for position, item_grams in enumerate(grams):
+            for gram in item_grams:
+                postings[gram].append(position)
+        return Snapshot(
+            keys=tuple(row[0] for row in rows),
+            items=tuple(
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for _, name, pk, unit in rows
+            ),
+            trigrams=grams,
+            postings={gram: tuple(found) for gram, found in postings.items()},
+        )
+
+    def actual(self):
+        """Возвращает индекс, перестроенный при смене версии."""
+        version, = get_versions(INGREDIENTS_VERSION)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.snapshot = self.build()
+                    self.version = version
+        return self
+
+    def prefix(self, query, snapshot=None):
+        snapshot = snapshot or self.snapshot
+        query = fold(query)
+        if not query:
+            return list(snapshot.items)
+        start = bisect_left(snapshot.keys, query)
+        end = bisect_left(snapshot.keys, query + chr(0x10FFFF), start)
+        return list(snapshot.items[start:end])
+
+    def fuzzy(self, query):
+        """Поиск с опечатками: сначала совпадения по префиксу, затем
+        ближайшие по триграммам названия."""
+        snapshot = self.snapshot
+        found = self.prefix(query, snapshot)
+        grams = trigrams(query)
+        if not grams:
+            return found
+        common = Counter()
+        for gram in grams:
+            common.update(snapshot.postings.get(gram, ()))
+        seen = {item['id'] for item in found}
+        ranked = []
+        for position, shared in common.items():
+            # Доля триграмм запроса, найденных в названии, и сходство
+            # всего названия с запросом.
+            coverage = shared / len(grams)
+            if coverage < FUZZY_THRESHOLD:
+                continue
+            similarity = shared / (
+                len(grams) + len(snapshot.trigrams[position]) - shared
+            )
+            ranked.append((-coverage, -similarity, position))
+        ranked.sort()
+        for _, _, position in ranked:
+            if len(found) >= FUZZY_LIMIT:
+                break
+            item = snapshot.items[position]
+            if item['id'] not in seen:
+                found.append(item)
+        return found
+
+
+ingredient_index = IngredientIndex()
@@ -1,14 +1,33 @@
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
                             Recipe, ShoppingCart, Tag)
+from recipes.shopping_list import change_recipe
 from users.models import Subscribe, User
 
 from .fields import Base64ImageField
+from .timing import TimedSerializerMixin
+
+
+def get_recipes_limit(request):
+    """Проверяет параметр recipes_limit запроса."""
+    limit = request.query_params.get('recipes_limit')
+    if limit in (None, ''):
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise serializers.ValidationError(
+            {'recipes_limit': ['Укажите целое неотрицательное число.']}
+        )
+    return limit
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
     """Сериализатор - просмотр пользователя."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -21,13 +40,15 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return Subscribe.objects.filter(user=user, author=obj).exists()
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+class SubscribeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор - создание/удаление подписок."""
     user = serializers.SlugRelatedField(
         slug_field='username',
@@ -53,7 +74,7 @@ class SubscribeSerializer(serializers.ModelSerializer):
 class SubscriptionsSerializer(CustomUserSerializer):
     """Сериализатор - просмотр подписок."""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -64,19 +85,18 @@ class SubscriptionsSerializer(CustomUserSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj)
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'latest_recipes'):
+            recipes = obj.latest_recipes
+        else:
+            limit = get_recipes_limit(self.context.get('request'))
+            recipes = Recipe.objects.filter(author=obj)
+            if limit is not None:
+                recipes = recipes[:limit]
         serializer = RecipeCartSerializer(recipes, many=True, read_only=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
 
-class RecipeCartSerializer(serializers.ModelSerializer):
+class RecipeCartSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор - мин. информация рецепта."""
     image = Base64ImageField()
 
@@ -85,7 +105,33 @@ class RecipeCartSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class TagSerializer(serializers.ModelSerializer):
+class PantrySerializer(TimedSerializerMixin, serializers.Serializer):
+    """Сериализатор - ингредиенты, которые есть у пользователя."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+    )
+
+
+class PantryRecipeSerializer(RecipeCartSerializer):
+    """Сериализатор - рецепт, подобранный по ингредиентам."""
+    matched_count = serializers.SerializerMethodField()
+    missing_ingredients = serializers.SerializerMethodField()
+
+    class Meta(RecipeCartSerializer.Meta):
+        fields = RecipeCartSerializer.Meta.fields + (
+            'matched_count', 'missing_ingredients'
+        )
+
+    def get_matched_count(self, obj):
+        return obj.matched_count
+
+    def get_missing_ingredients(self, obj):
+        return IngredientSerializer(obj.missing_ingredients, many=True).data
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор - информация тега."""
 
     class Meta:
@@ -93,7 +139,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор - информация ингриндиента."""
 
     class Meta:
@@ -101,7 +147,8 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
-class IngredientRecipeSerializer(serializers.ModelSerializer):
+class IngredientRecipeSerializer(TimedSerializerMixin,
+                                 serializers.ModelSerializer):
     """Сериализатор - добавление ингриндиента."""
     id = serializers.IntegerField()
     amount = serializers.IntegerField()
@@ -135,11 +182,9 @@ class IngredientFullSerializer(IngredientSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """"Сериализатор - создание/изменение рецепта."""
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientRecipeSerializer(many=True)
     image = Base64ImageField()
@@ -156,29 +201,30 @@ class RecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Выберите хотя бы один тэг.'
             )
-        for tag_name in data:
-            if not Tag.objects.filter(name=tag_name).exists():
-                raise serializers.ValidationError(
-                    'Такого тэга нет.'
-                )
+        tags = Tag.objects.in_bulk(data)
+        if len(tags) != len(set(data)):
+            raise serializers.ValidationError(
+                'Такого тэга нет.'
+            )
         if len(data) != len(set(data)):
             raise serializers.ValidationError(
                 'Теги не должны повторяться.'
             )
-        return data
+        return [tags[tag_id] for tag_id in data]
 
     def validate_ingredients(self, data):
         if len(data) < 1:
             raise serializers.ValidationError(
                 'Выберите хотя бы один ингредиент.'
             )
-        ingredients = []
-        for i, val in enumerate(data):
-            if not Ingredient.objects.filter(id=val['id']).exists():
-                raise serializers.ValidationError(
-                    'Выберите ингредиент из доступных.'
-                )
-            ingredients.append(val['id'])
+        ingredients = [val['id'] for val in data]
+        existing = Ingredient.objects.filter(
+            id__in=ingredients
+        ).order_by().values_list('id', flat=True)
+        if len(existing) != len(set(ingredients)):
+            raise serializers.ValidationError(
+                'Выберите ингредиент из доступных.'
+            )
         if len(ingredients) != len(set(ingredients)):
             raise serializers.ValidationError(
                 'Ингредиенты не должны повторяться.'
@@ -197,15 +243,57 @@ class RecipeSerializer(serializers.ModelSerializer):
         return data
 
     def create_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+        recipe.tags.add(*tags)
 
     def create_ingredients(self, ingredients, recipe):
-        for i in ingredients:
-            ingredient = Ingredient.objects.get(id=i['id'])
-            IngredientRecipe.objects.create(
-                ingredient=ingredient, recipe=recipe, amount=i['amount'])
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                ingredient_id=i['id'], recipe=recipe, amount=i['amount']
+            ) for i in ingredients
+        )
 
+    def update_tags(self, tags, recipe):
+        current = set(recipe.tags.values_list('id', flat=True))
+        submitted = {tag.id for tag in tags}
+        if submitted - current:
+            recipe.tags.add(*(submitted - current))
+        if current - submitted:
+            recipe.tags.remove(*(current - submitted))
+
+    def update_ingredients(self, ingredients, recipe):
+        """Обновляет только изменившиеся строки IngredientRecipe."""
+        current = {
+            row.ingredient_id: row for row in recipe.recipe_ingredient.all()
+        }
+        submitted = {i['id']: i['amount'] for i in ingredients}
+        deltas = {
+            ingredient_id: submitted.get(ingredient_id, 0) - (
+                current[ingredient_id].amount if ingredient_id in current
+                else 0
+            )
+            for ingredient_id in current.keys() | submitted.keys()
+        }
+        added = [
+            i for i in ingredients if i['id'] not in current
+        ]
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = submitted.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        removed = current.keys() - submitted.keys()
+        if added:
+            self.create_ingredients(added, recipe)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        change_recipe(recipe.id, deltas)
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
@@ -214,6 +302,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         self.create_tags(tags=tags, recipe=recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.image = validated_data.get('image', instance.image)
@@ -221,24 +310,26 @@ class RecipeSerializer(serializers.ModelSerializer):
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
-        if isinstance(validated_data['tags'], list):
-            tags = validated_data.pop('tags')
-            instance.tags.clear()
-            instance.tags.set(tags)
-        if isinstance(validated_data['ingredients'], list):
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredients(ingredients, instance)
+        if 'tags' in validated_data:
+            self.update_tags(validated_data.pop('tags'), instance)
+        if 'ingredients' in validated_data:
+            self.update_ingredients(
+                validated_data.pop('ingredients'), instance
+            )
         instance.save()
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         return RecipeRetriveSerializer(instance, context=context).data
 
 
-class RecipeRetriveSerializer(serializers.ModelSerializer):
+class RecipeRetriveSerializer(TimedSerializerMixin,
+                              serializers.ModelSerializer):
     """"Сериализатор - просмотр рецепта."""
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
@@ -258,7 +349,14 @@ class RecipeRetriveSerializer(serializers.ModelSerializer):
             'name', 'image', 'text', 'cooking_time'
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user.id
         recipe = obj.id
         return FavoriteRecipe.objects.filter(
@@ -267,6 +365,8 @@ class RecipeRetriveSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user.id
         recipe = obj.id
         return ShoppingCart.objects.filter(
@@ -0,0 +1,281 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.versions import (INGREDIENTS_VERSION, SHARED_VERSIONS,
+                           TAGS_VERSION, bump_versions, user_flags_version_key,
+                           versions_bumped)
+from recipes import counters, feed, shopping_list
+from recipes.fulltext import index_recipes
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart, Tag)
+from recipes.pantry import record_change
+from users.models import Subscribe, User
+
+from .authentication import forget_tokens
+from .cache import invalidate_recipes
+from .replicas import pin_shared_reads
+
+# Поля пользователя, которые попадают в представление рецепта.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+pending = threading.local()
+
+
+class TransactionState:
+    """Данные, общие для текущей транзакции потока.
+
+    Объект вызывается после коммита. При откате он снимается
+    с run_on_commit, и current() начинает новый; вне транзакции новый
+    объект создается при каждом обращении.
+    """
+
+    name = None
+
+    @classmethod
+    def current(cls):
+        connection = transaction.get_connection()
+        state = getattr(pending, cls.name, None)
+        if state is None or not any(
+            func is state for _, func in connection.run_on_commit
+        ):
+            state = cls()
+            setattr(pending, cls.name, state)
+            if connection.in_atomic_block:
+                transaction.on_commit(state)
+        return state
+
+    def __call__(self):
+        if getattr(pending, self.name, None) is self:
+            setattr(pending, self.name, None)
+        self.committed()
+
+    def committed(self):
+        pass
+
+
+class DeletingRecipes(TransactionState):
+    """Рецепты, удаляемые в текущей транзакции. Их корзины удаляются
+    каскадом, а сводные списки уже поправлены в recipe_deleting."""
+
+    name = 'deleting'
+
+    def __init__(self):
+        self.ids = set()
+
+
+def touch_recipes(recipe_ids):
+    """Сбрасывает кеш рецептов, представление которых изменилось
+    без сохранения самого рецепта, и сдвигает их дату изменения."""
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+        invalidate_recipes(recipe_ids)
+
+
+class RecipeChanges(TransactionState):
+    """Рецепты, измененные в текущей транзакции.
+
+    Строки ингредиентов и тегов меняются по одной, а рецепт
+    обновляется, сбрасывается в кеше и переиндексируется один раз
+    после коммита.
+    """
+
+    name = 'changes'
+
+    def __init__(self):
+        self.saved = set()
+        self.touched = set()
+        self.indexed = set()
+
+    def committed(self):
+        # Сохраненные рецепты уже получили новую дату и сброс кеша.
+        touch_recipes(self.touched - self.saved)
+        index_recipes(self.indexed)
+        for recipe_id in self.indexed:
+            record_change(recipe_id)
+
+
+def recipes_changed(recipe_ids, reindex=True, saved=False):
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    changes = RecipeChanges.current()
+    (changes.saved if saved else changes.touched).update(recipe_ids)
+    if reindex:
+        changes.indexed.update(recipe_ids)
+    if not transaction.get_connection().in_atomic_block:
+        changes()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.id])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    # Ингредиенты и теги сохраняются после рецепта в той же
+    # транзакции, поэтому индексы обновляются после коммита.
+    recipes_changed([instance.id], saved=True)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: feed.fan_out(instance.id))
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(sender, instance, **kwargs):
+    # Автор запоминается, чтобы перенести счетчик при его смене.
+    instance.previous_author_id = None
+    if not instance._state.adding:
+        instance.previous_author_id = Recipe.objects.filter(
+            pk=instance.pk
+        ).values_list('author_id', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_counted(sender, instance, created, **kwargs):
+    previous = getattr(instance, 'previous_author_id', None)
+    if created:
+        counters.change(User, instance.author_id, 'recipes_count', 1)
+    elif previous is not None and previous != instance.author_id:
+        counters.change(User, previous, 'recipes_count', -1)
+        counters.change(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    counters.change(User, instance.author_id, 'recipes_count', -1)
+    DeletingRecipes.current().ids.discard(instance.id)
+    transaction.on_commit(lambda: record_change(instance.id))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Корзины удаляются каскадом, убираем рецепт из сводных списков
+    # одним проходом, а не по корзине.
+    DeletingRecipes.current().ids.add(instance.id)
+    shopping_list.change_recipe(instance.id, {
+        ingredient_id: -amount for ingredient_id, amount
+        in shopping_list.recipe_amounts(instance.id).items()
+    })
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    # Строки удаляемого рецепта уходят вместе с ним.
+    if instance.recipe_id not in DeletingRecipes.current().ids:
+        recipes_changed([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipes_changed([instance.id], reindex=False)
+    elif pk_set:
+        recipes_changed(pk_set, reindex=False)
+    else:
+        recipes_changed(
+            instance.recipes.values_list('id', flat=True), reindex=False
+        )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    bump_versions(TAGS_VERSION)
+    touch_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    bump_versions(INGREDIENTS_VERSION)
+    recipes_changed(
+        instance.ingredient_recipe.values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    touch_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    # Смена пароля, деактивация и правка профиля.
+    forget_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # Выход (token/logout) и каскадное удаление пользователя.
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=Subscribe)
+def subscribed(sender, instance, created, **kwargs):
+    if created:
+        counters.change(User, instance.author_id, 'subscribers_count', 1)
+        bump_versions(user_flags_version_key(instance.user_id))
+        transaction.on_commit(
+            lambda: feed.backfill(instance.user_id, instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Subscribe)
+def unsubscribed(sender, instance, **kwargs):
+    counters.change(User, instance.author_id, 'subscribers_count', -1)
+    bump_versions(user_flags_version_key(instance.user_id))
+    feed.prune(instance.user_id, instance.author_id)
+    transaction.on_commit(lambda: feed.demote(instance.author_id))
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+def favorite_changed(sender, instance, created=True, **kwargs):
+    bump_versions(user_flags_version_key(instance.user_id))
+    if kwargs['signal'] is post_delete:
+        counters.change(Recipe, instance.recipe_id, 'favorites_count', -1)
+    elif created:
+        counters.change(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, created=True, **kwargs):
+    bump_versions(user_flags_version_key(instance.user_id))
+    if kwargs['signal'] is post_delete:
+        counters.change(Recipe, instance.recipe_id, 'shopping_cart_count', -1)
+        if instance.recipe_id not in DeletingRecipes.current().ids:
+            shopping_list.remove_recipe(instance.user_id, instance.recipe_id)
+    elif created:
+        counters.change(Recipe, instance.recipe_id, 'shopping_cart_count', 1)
+        shopping_list.add_recipe(instance.user_id, instance.recipe_id)
+
+
+@receiver(versions_bumped)
+def shared_versions_bumped(sender, keys, **kwargs):
+    # Пока реплики догоняют, общие кеши заполняются с primary.
+    if SHARED_VERSIONS.intersection(keys):
+        pin_shared_reads()
@@ -0,0 +1,179 @@
+import random
+import sys
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from loguru import logger
+
+current_timing = ContextVar('current_timing', default=None)
+_sink_added = False
+
+
+class Timing:
+    """Замер одного запроса; время в секундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_finished = None
+        self.spent = {'serializer': 0.0, 'auth': 0.0, 'permissions': 0.0}
+        self.active = set()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.sql_trace = []
+
+    def record_sql(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_time += duration
+            self.sql_trace.append((sql, round(duration * 1000, 3)))
+
+    def metrics(self, finished):
+        """Длительности этапов в миллисекундах."""
+        result = {
+            'total': finished - self.started,
+            'sql': self.sql_time,
+            **self.spent,
+        }
+        if self.view_finished is not None:
+            result['render'] = finished - self.view_finished
+        return {name: round(value * 1000, 1) for name, value in result.items()}
+
+
+def timed(stage):
+    """Добавляет время вызова к этапу текущего замера. Вложенные
+    вызовы (сериализатор внутри сериализатора) не учитываются дважды."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timing = current_timing.get()
+            if timing is None or stage in timing.active:
+                return func(*args, **kwargs)
+            timing.active.add(stage)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing.spent[stage] += time.perf_counter() - start
+                timing.active.discard(stage)
+        return wrapper
+    return decorator
+
+
+class TimedViewMixin:
+    """Учитывает в замере аутентификацию и проверку прав вьюхи DRF."""
+
+    @timed('auth')
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+
+    @timed('permissions')
+    def check_permissions(self, request):
+        super().check_permissions(request)
+
+    @timed('permissions')
+    def check_object_permissions(self, request, obj):
+        super().check_object_permissions(request, obj)
+
+
+class TimedSerializerMixin:
+    """Учитывает в замере to_representation сериализатора."""
+
+    @timed('serializer')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+def add_sink():
+    """Добавляет вывод записей замеров в JSON: стандартный вывод loguru
+    не показывает extra, а в нем поля замера и SQL медленных запросов."""
+    global _sink_added
+    if _sink_added:
+        return
+    _sink_added = True
+    logger.add(
+        sys.stderr, level='INFO', serialize=True,
+        filter=lambda record: 'timing' in record['extra']
+    )
+
+
+class ServerTimingMiddleware:
+    """Замеряет запросы и отдает результат в заголовке Server-Timing
+    и в логе.
+
+    Если задан порог SERVER_TIMING_SLOW_MS, замеряется каждый запрос,
+    и для запросов дольше порога в лог пишется полный список
+    SQL-запросов. Заголовок и запись о запросе в логе получает доля
+    SERVER_TIMING_SAMPLE_RATE. По умолчанию оба параметра не заданы,
+    и middleware отключается целиком. Этапы вьюх и сериализаторов
+    замеряют TimedViewMixin и TimedSerializerMixin.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.SERVER_TIMING_SAMPLE_RATE
+        self.slow = settings.SERVER_TIMING_SLOW_MS
+        if self.sample_rate <= 0 and self.slow <= 0:
+            raise MiddlewareNotUsed
+        add_sink()
+
+    def __call__(self, request):
+        sampled = random.random() < self.sample_rate
+        timing = Timing()
+        token = current_timing.set(timing)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.record_sql)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        metrics = timing.metrics(time.perf_counter())
+        slow = 0 < self.slow <= metrics['total']
+        if not sampled and not slow:
+            return response
+        if sampled:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={value}'
+                + (f';desc="{timing.sql_count} queries"'
+                   if name == 'sql' else '')
+                for name, value in metrics.items()
+            )
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'sql_count': timing.sql_count,
+            **{f'{name}_ms': value for name, value in metrics.items()},
+        }
+        if slow:
+            logger.bind(timing=True, sql_trace=timing.sql_trace).warning(
+                'Медленный запрос {method} {path}: {status}, '
+                '{total_ms} мс, SQL: {sql_count} за {sql_ms} мс',
+                **fields
+            )
+        else:
+            logger.bind(timing=True).info(
+                'Запрос {method} {path}: {status}, '
+                '{total_ms} мс, SQL: {sql_count} за {sql_ms} мс',
+                **fields
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # Вызывается после вьюхи и до рендеринга ответа.
+        timing = current_timing.get()
+        if timing is not None:
+            timing.view_finished = time.perf_counter()
+        return response
@@ -1,7 +1,9 @@
+import hashlib
 from datetime import date
 
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
@@ -9,20 +11,35 @@ from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from recipes.models import (FavoriteRecipe, Ingredient, IngredientRecipe,
-                            Recipe, ShoppingCart, Tag)
+from core.versions import (INGREDIENTS_VERSION, get_versions,
+                           shopping_list_version_key)
+from recipes.feed import feed_page
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
+from recipes.pantry import pantry_index
 from users.models import Subscribe, User
 
+from .cache import (cache_anonymous_response, conditional_response,
+                    etag_matches, ingredient_validators, recipe_detail_key,
+                    recipe_detail_validators, recipe_list_key,
+                    tag_validators)
+from .exports import EXPORTS
 from .filters import IngredientFilter, RecipeFilter
+from .fragments import render_recipes
+from .pagination import RecipePagination
 from .permissions import AdminOrReadOnly, AuthorOrAdminOrReadOnly
-from .serializers import (CustomUserSerializer,
-                          IngredientSerializer, RecipeCartSerializer,
-                          RecipeRetriveSerializer, RecipeSerializer,
-                          SubscribeSerializer, SubscriptionsSerializer,
-                          TagSerializer)
+from .search import fold, ingredient_index
+from .serializers import (CustomUserSerializer, IngredientSerializer,
+                          PantryRecipeSerializer, PantrySerializer,
+                          RecipeCartSerializer, RecipeRetriveSerializer,
+                          RecipeSerializer, SubscribeSerializer,
+                          SubscriptionsSerializer, TagSerializer,
+                          get_recipes_limit)
+from .timing import TimedViewMixin
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(TimedViewMixin, UserViewSet):
+    read_from_replica = True
     queryset = User.objects.all()
     search_fields = ('username', 'email',)
     permission_classes = [AuthorOrAdminOrReadOnly]
@@ -53,7 +70,8 @@ class CustomUserViewSet(UserViewSet):
                 context={"request": request}
             )
             serializer.is_valid(raise_exception=True)
-            Subscribe.objects.create(user=subscriber, author=sub_author)
+            with transaction.atomic():
+                Subscribe.objects.create(user=subscriber, author=sub_author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if not instance.exists():
@@ -61,7 +79,8 @@ class CustomUserViewSet(UserViewSet):
                 {"errors": 'Вы не подписаны на этого автора.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        instance.delete()
+        with transaction.atomic():
+            instance.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -72,22 +91,42 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         """Функция возвращает список подписок."""
-        sub_authors = User.objects.filter(sub_author__user=request.user)
+        limit = get_recipes_limit(request)
+        sub_authors = User.objects.filter(
+            sub_author__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, BooleanField()),
+        ).order_by('username')
         paginated_queryset = self.paginate_queryset(sub_authors)
+        latest = Recipe.objects.latest_by_author(
+            [author.id for author in paginated_queryset], limit
+        )
+        for author in paginated_queryset:
+            author.latest_recipes = latest[author.id]
         serializer = SubscriptionsSerializer(
             paginated_queryset, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(TimedViewMixin, viewsets.ModelViewSet):
+    read_from_replica = True
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AdminOrReadOnly]
     pagination_class = None
 
+    @conditional_response(tag_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(tag_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(TimedViewMixin, viewsets.ModelViewSet):
+    read_from_replica = True
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AdminOrReadOnly]
@@ -95,19 +134,63 @@ class IngredientViewSet(viewsets.ModelViewSet):
     search_fields = ('^name',)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Автодополнение по префиксу из индекса в памяти.
+
+        С параметром fuzzy=true ищет с учетом опечаток.
+        """
+        index = ingredient_index.actual()
+        name = request.query_params.get('name', '')
+        fuzzy = request.query_params.get('fuzzy') in ('1', 'true')
+        digest = hashlib.md5(f'{fuzzy}:{fold(name)}'.encode()).hexdigest()
+        etag = f'"{index.version}-{digest}"'
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif fuzzy:
+            response = Response(index.fuzzy(name))
+        else:
+            response = Response(index.prefix(name))
+        response['ETag'] = etag
+        return response
+
+    @conditional_response(ingredient_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TimedViewMixin, viewsets.ModelViewSet):
+    read_from_replica = True
     queryset = Recipe.objects.all()
     permission_classes = [AuthorOrAdminOrReadOnly]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
     ordering = ('pub_date',)
 
+    def get_queryset(self):
+        if self.action in ('retrieve', 'list'):
+            # Теги, автор и ингредиенты берутся из кешированных
+            # фрагментов, выборке нужны только флаги пользователя.
+            return Recipe.objects.with_user_flags(self.request.user)
+        return Recipe.objects.all()
+
     def get_serializer_class(self):
         if self.action in ('retrieve', 'list'):
             return RecipeRetriveSerializer
         return RecipeSerializer
 
+    @cache_anonymous_response(recipe_list_key)
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(render_recipes(page, request))
+
+    @conditional_response(recipe_detail_validators, vary=('Authorization',))
+    @cache_anonymous_response(recipe_detail_key)
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return Response(render_recipes([instance], request)[0])
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -127,7 +210,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 return Response({'errors': 'Рецепт уже добавлен '
                                  'в избранное.'},
                                 status=status.HTTP_400_BAD_REQUEST)
-            FavoriteRecipe.objects.create(user=user, recipe=recipe)
+            with transaction.atomic():
+                FavoriteRecipe.objects.create(user=user, recipe=recipe)
             serializer = RecipeCartSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -137,7 +221,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
                             'или уже удален.')},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        instance.delete()
+        with transaction.atomic():
+            instance.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -155,7 +240,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
                                 status=status.HTTP_400_BAD_REQUEST
                                 )
 
-            ShoppingCart.objects.create(user=user, recipe=recipe)
+            with transaction.atomic():
+                ShoppingCart.objects.create(user=user, recipe=recipe)
             serializer = RecipeCartSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if request.method == 'DELETE':
@@ -165,38 +251,99 @@ class RecipeViewSet(viewsets.ModelViewSet):
                                 'или уже удален.')},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            instance.delete()
+            with transaction.atomic():
+                instance.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': ('Запрос не понятен')},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(
+        detail=False, methods=['GET'],
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def feed(self, request):
+        """Функция возвращает ленту рецептов авторов из подписок."""
+        page = self.paginator.paginate_keyset(
+            lambda position, limit: feed_page(request.user, position, limit),
+            request
+        )
+        return self.get_paginated_response(render_recipes(page, request))
+
+    @action(
+        detail=False, methods=['POST'],
+    )
+    def pantry(self, request):
+        """Функция подбирает рецепты по имеющимся ингредиентам."""
+        serializer = PantrySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        limit = self.paginator.get_limit(request)
+        found = pantry_index.actual().search(
+            serializer.validated_data['ingredients'], limit
+        )
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in found]
+        )
+        ingredients = Ingredient.objects.in_bulk({
+            ingredient_id
+            for _, _, missing in found for ingredient_id in missing
+        })
+        result = []
+        for recipe_id, matched_count, missing in found:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.matched_count = matched_count
+            # Ингредиент мог быть удален после построения индекса.
+            recipe.missing_ingredients = [
+                ingredients[ingredient_id] for ingredient_id in missing
+                if ingredient_id in ingredients
+            ]
+            result.append(recipe)
+        return Response(PantryRecipeSerializer(
+            result, many=True, context={'request': request}
+        ).data)
+
     @action(
         detail=False, methods=['GET'],
     )
     def download_shopping_cart(self, request):
-        """Функция скачивает список покупок."""
+        """Функция скачивает список покупок.
+
+        Формат задается параметром filetype: txt (по умолчанию), csv,
+        json или pdf.
+        """
         user = request.user
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
+        filetype = request.query_params.get('filetype', 'txt')
+        if filetype not in EXPORTS:
+            return Response(
+                {'errors': f'Доступные форматы: {", ".join(EXPORTS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        today = date.today()
+        # Названия ингредиентов тоже попадают в файл.
+        version, catalog = get_versions(
+            shopping_list_version_key(user.id), INGREDIENTS_VERSION
+        )
+        etag = f'"{version}-{catalog}-{today}-{filetype}"'
+        if etag_matches(request, etag):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        ingredients = ShoppingListItem.objects.filter(
+            user=user
         ).order_by(
             'ingredient__name'
-        ).annotate(
-            ingredient_amount=Sum('amount')
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).iterator()
+        export, content_type = EXPORTS[filetype]
+        response = StreamingHttpResponse(
+            export(ingredients, today), content_type=content_type
         )
-
-        today = date.today()
-        shopping_list = [f'{today}\n''Список покупок:\n']
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['ingredient_amount']
-            shopping_list.append(f'\n{name} ({unit}) - {amount}')
-
-        filename = 'shopping_list.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        filename = f'shopping_list.{filetype}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
+        response['ETag'] = etag
         return response
@@ -0,0 +1,99 @@
+import json
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+# До этого числа строк (по оценке планировщика) считаем точно.
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimated_count(queryset):
+    """Оценка числа строк выборки по плану запроса PostgreSQL."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, не выполняющий COUNT(*) на больших таблицах.
+
+    Оценку дает только EXPLAIN PostgreSQL; на других базах и для
+    списков число строк считается точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if (not isinstance(queryset, QuerySet)
+                or connections[queryset.db].vendor != 'postgresql'):
+            return super().count
+        try:
+            estimate = estimated_count(queryset)
+        except EmptyResultSet:
+            return 0
+        if estimate < EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """Фильтр по внешнему ключу с поиском вместо списка всех значений.
+
+    Варианты подгружаются через autocomplete админки, поэтому у админки
+    связанной модели должны быть search_fields, а сам фильтр
+    подключается в LargeTableAdmin, которая добавляет скрипты select2.
+    """
+    template = 'admin/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f'{self.field_name}__id__exact'
+        super().__init__(request, params, model, model_admin)
+        if self.value() and not self.value().isdigit():
+            raise IncorrectLookupParameters(self.value())
+        field = model._meta.get_field(self.field_name)
+        choice_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.rendered_widget = choice_field.widget.render(
+            self.parameter_name, self.value(),
+            attrs={'style': 'width: 100%', 'data-allow-clear': 'true'}
+        )
+        self.hidden_params = [
+            (key, value) for key, value in request.GET.items()
+            if key not in (self.parameter_name, 'p')
+        ]
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Админка для таблиц с миллионами строк."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(None, self.admin_site).media
@@ -0,0 +1,65 @@
+class ChangedFieldsMixin:
+    """Сохранение только измененных полей.
+
+    Счетчики (COUNTER_FIELDS) меняются только через F(), и сохранение
+    устаревшего объекта не должно их перезаписывать. Загруженные из
+    базы значения запоминаются, и save() без update_fields пишет лишь
+    изменившиеся поля и поля auto_now. Если ничего не изменилось,
+    пишутся все поля, кроме счетчиков: сохранение и его сигналы не
+    пропускаются. Объект, не загруженный из базы, сохраняется обычным
+    образом.
+    """
+
+    COUNTER_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def saved_fields(self):
+        """Поля, которые пишет save(): все, кроме ключа, отложенных
+        полей и счетчиков."""
+        deferred = self.get_deferred_fields()
+        return [
+            field for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname not in deferred
+            and field.name not in self.COUNTER_FIELDS
+        ]
+
+    def changed_fields(self):
+        loaded = getattr(self, '_loaded_values', {})
+        # Поле, загруженное позже (отложенное), считается измененным.
+        return [
+            field.name for field in self.saved_fields()
+            if field.attname not in loaded
+            or getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+    def save(self, *args, **kwargs):
+        if (kwargs.get('update_fields') is None and not self._state.adding
+                and hasattr(self, '_loaded_values')):
+            changed = self.changed_fields()
+            if changed:
+                kwargs['update_fields'] = changed + [
+                    field.name for field in self._meta.concrete_fields
+                    if getattr(field, 'auto_now', False)
+                    and field.name not in changed
+                ]
+            else:
+                kwargs['update_fields'] = [
+                    field.name for field in self.saved_fields()
+                ]
+        super().save(*args, **kwargs)
+        saved = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            **getattr(self, '_loaded_values', {}),
+            **{
+                field.attname: getattr(self, field.attname)
+                for field in self._meta.concrete_fields
+                if field.attname not in deferred
+                and (saved is None or field.name in saved)
+            },
+        }
@@ -0,0 +1,52 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+
+# Отправляется после смены версий, keys - смененные ключи.
+versions_bumped = Signal()
+
+RECIPE_LIST_VERSION = 'recipes:list:version'
+INGREDIENTS_VERSION = 'ingredients:version'
+TAGS_VERSION = 'tags:version'
+# Версии данных, общих для всех пользователей.
+SHARED_VERSIONS = {RECIPE_LIST_VERSION, INGREDIENTS_VERSION, TAGS_VERSION}
+
+
+def recipe_version_key(recipe_id):
+    return f'recipes:{recipe_id}:version'
+
+
+def shopping_list_version_key(user_id):
+    return f'shopping_list:{user_id}:version'
+
+
+def user_flags_version_key(user_id):
+    """Версия избранного, корзины и подписок пользователя."""
+    return f'users:{user_id}:flags:version'
+
+
+def get_versions(*keys):
+    """Возвращает текущие версии по ключам, создавая недостающие."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*keys):
+    """Меняет версии после коммита транзакции.
+
+    До коммита другой воркер мог бы закешировать еще старые данные
+    уже под новой версией.
+    """
+    if not keys:
+        return
+
+    def bump():
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+        versions_bumped.send(sender=None, keys=keys)
+    transaction.on_commit(bump)
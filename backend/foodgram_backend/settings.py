@@ -27,12 +27,15 @@ INSTALLED_APPS = [
     'django_filters',
     'djoser',
 
+    'core.apps.CoreConfig',
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -74,6 +78,35 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: DB_REPLICA_HOSTS=replica1,replica2.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Реплика с большим отставанием, секунд, исключается из ротации.
+DATABASE_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))
+# Сколько секунд после записи читать с primary.
+DATABASE_REPLICA_PIN_TIMEOUT = int(os.getenv('DB_REPLICA_PIN_TIMEOUT', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -98,7 +131,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -121,6 +154,35 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Новые рецепты авторов, у которых подписчиков больше этого числа,
+# не раскладываются по лентам, а подмешиваются при чтении.
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 5000))
+
+
+# Фрагменты рецептов собираются из строк БД без полей DRF
+# (api.readers); False - через RecipeRetriveSerializer.
+FAST_READ_SERIALIZERS = os.getenv(
+    'FAST_READ_SERIALIZERS', 'True'
+).lower() in ('true', '1')
+
+# Доля запросов с заголовком Server-Timing (0 - выключено).
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv('SERVER_TIMING_SAMPLE_RATE', 0))
+# Для запросов дольше этого порога, мс, в лог пишется весь SQL
+# независимо от доли выше (не задан или 0 - выключено).
+SERVER_TIMING_SLOW_MS = int(os.getenv('SERVER_TIMING_SLOW_MS') or 0)
+
+# /metrics доступен с этих адресов или с токеном в заголовке
+# Authorization: Bearer <токен>.
+METRICS_ALLOWED_IPS = list(
+    filter(None, os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(','))
+)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
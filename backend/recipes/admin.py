@@ -1,13 +1,26 @@
 from django.contrib import admin
 
+from core.admin_tools import AutocompleteFilter, LargeTableAdmin
+
 from .models import (FavoriteRecipe, Ingredient, IngredientRecipe,
                      Recipe, ShoppingCart, Tag)
+from .shopping_list import change_recipe, recipe_amounts
 
 EMPTY_VALUE = '-пусто-'
 
 
+class AuthorFilter(AutocompleteFilter):
+    title = 'Автор'
+    field_name = 'author'
+
+
+class RecipeFilter(AutocompleteFilter):
+    title = 'Рецепт'
+    field_name = 'recipe'
+
+
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'measurement_unit',)
     search_fields = ('name',)
     list_filter = ('measurement_unit',)
@@ -22,35 +35,50 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(FavoriteRecipe)
-class FavoriteRecipeAdmin(admin.ModelAdmin):
+class FavoriteRecipeAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe',)
-    search_fields = ('user',)
-    list_filter = ('recipe',)
+    list_select_related = ('user', 'recipe',)
+    search_fields = ('user__username', 'user__email',)
+    list_filter = (RecipeFilter,)
+    autocomplete_fields = ('user', 'recipe',)
     empty_value_display = EMPTY_VALUE
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe',)
-    search_fields = ('user',)
-    list_filter = ('recipe',)
+    list_select_related = ('user', 'recipe',)
+    search_fields = ('user__username', 'user__email',)
+    list_filter = (RecipeFilter,)
+    autocomplete_fields = ('user', 'recipe',)
     empty_value_display = EMPTY_VALUE
 
 
 class IngredientRecipeInline(admin.TabularInline):
     model = IngredientRecipe
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'author', 'pub_date',
-                    'is_favorited', 'cooking_time')
+                    'is_favorited', 'shopping_cart_count', 'cooking_time')
+    list_select_related = ('author',)
     search_fields = ('name',)
-    list_filter = ('name', 'author', 'tags',)
-    readonly_fields = ('is_favorited',)
+    list_filter = (AuthorFilter, 'tags',)
+    autocomplete_fields = ('author',)
+    readonly_fields = ('is_favorited', 'shopping_cart_count')
     inlines = (IngredientRecipeInline,)
     empty_value_display = EMPTY_VALUE
 
+    @admin.display(description='В избранном')
     def is_favorited(self, obj):
-        return FavoriteRecipe.objects.filter(recipe=obj).count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        before = recipe_amounts(form.instance.id)
+        super().save_related(request, form, formsets, change)
+        after = recipe_amounts(form.instance.id)
+        after.subtract(before)
+        change_recipe(form.instance.id, after)
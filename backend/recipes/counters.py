@@ -0,0 +1,44 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Subscribe, User
+
+from .models import FavoriteRecipe, Recipe, ShoppingCart
+
+# Счетчик: (модель, поле, считаемая модель, внешний ключ на модель).
+COUNTERS = (
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribe, 'author'),
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+)
+
+
+def change(model, pk, field, delta):
+    """Атомарно меняет счетчик на delta, не опуская его ниже нуля."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def expected_counts(related, key, pks):
+    """Значения счетчика, посчитанные заново {pk: количество}."""
+    return dict(
+        related.objects.filter(**{f'{key}__in': pks}).values(key).annotate(
+            total=Count('pk')
+        ).values_list(key, 'total').order_by()
+    )
+
+
+def fill_counters():
+    """Пересчитывает все счетчики одним запросом на счетчик.
+
+    Для загрузки данных в обход сигналов; на живой базе безопаснее
+    команда recount_counters, которая блокирует строки пачками.
+    """
+    for model, field, related, key in COUNTERS:
+        totals = related.objects.filter(
+            **{key: OuterRef('pk')}
+        ).values(key).annotate(total=Count('pk')).values('total')
+        model.objects.update(**{field: Coalesce(Subquery(totals), 0)})
@@ -0,0 +1,172 @@
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from users.models import Subscribe, User
+
+from .models import FeedEntry, Recipe
+
+CELEBRITIES_KEY = 'feed:celebrities'
+# У автора есть рецепты, не разложенные по лентам, пока он был
+# популярным.
+SKIPPED_KEY = 'feed:skipped:{}'
+CELEBRITIES_TIMEOUT = 10 * 60
+FANOUT_BATCH_SIZE = 1000
+# Сколько последних рецептов автора попадает в ленту при подписке.
+BACKFILL_SIZE = 200
+
+
+def celebrity_ids():
+    """Авторы, чьи рецепты подмешиваются в ленты при чтении."""
+    authors = cache.get(CELEBRITIES_KEY)
+    if authors is None:
+        authors = set(User.objects.filter(
+            subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('id', flat=True).order_by())
+        cache.set(CELEBRITIES_KEY, authors, CELEBRITIES_TIMEOUT)
+    return authors
+
+
+def is_celebrity(author_id):
+    if author_id in celebrity_ids():
+        return True
+    subscribers = User.objects.filter(id=author_id).values_list(
+        'subscribers_count', flat=True
+    ).first()
+    if subscribers and subscribers > settings.FEED_FANOUT_LIMIT:
+        # Автор перешел порог: пересчитываем список при следующем чтении.
+        cache.delete(CELEBRITIES_KEY)
+        return True
+    return False
+
+
+def fan_out(recipe_id):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    recipe = Recipe.objects.filter(id=recipe_id).values(
+        'author_id', 'pub_date'
+    ).first()
+    if recipe is None:
+        return
+    if is_celebrity(recipe['author_id']):
+        cache.set(SKIPPED_KEY.format(recipe['author_id']), 1, timeout=None)
+        return
+    deliver(recipe['author_id'], [(recipe_id, recipe['pub_date'])])
+
+
+def deliver(author_id, recipes):
+    """Добавляет рецепты (id, pub_date) в ленты всех подписчиков
+    автора пачками по FANOUT_BATCH_SIZE."""
+    subscribers = Subscribe.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).order_by()
+    batch = []
+    for user_id in subscribers.iterator(chunk_size=FANOUT_BATCH_SIZE):
+        batch.extend(
+            FeedEntry(
+                user_id=user_id, author_id=author_id,
+                recipe_id=recipe_id, pub_date=pub_date
+            )
+            for recipe_id, pub_date in recipes
+        )
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def latest_recipes(author_id):
+    return list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:BACKFILL_SIZE])
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id, author_id=author_id,
+                recipe_id=recipe_id, pub_date=pub_date
+            )
+            for recipe_id, pub_date in latest_recipes(author_id)
+        ),
+        ignore_conflicts=True
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты рецепты автора после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def demote(author_id):
+    """Автор опустился до порога FEED_FANOUT_LIMIT: рецепты, которые
+    раньше подмешивались при чтении, раскладываются по лентам."""
+    key = SKIPPED_KEY.format(author_id)
+    if not cache.get(key):
+        return
+    subscribers = User.objects.filter(id=author_id).values_list(
+        'subscribers_count', flat=True
+    ).first()
+    if subscribers is None or subscribers > settings.FEED_FANOUT_LIMIT:
+        return
+    # Ключ удаляет только один из параллельных вызовов.
+    if not cache.delete(key):
+        return
+    deliver(author_id, latest_recipes(author_id))
+    # Списки популярных авторов пересчитываются после раскладки,
+    # чтобы рецепты не пропали из лент в промежутке.
+    cache.delete(CELEBRITIES_KEY)
+
+
+def after(position, date_field, id_field):
+    if position is None:
+        return Q()
+    pub_date, pk = position
+    # Граница pub_date <= позиции дает диапазон по индексу, OR
+    # остается фильтром для записей с той же датой.
+    return Q(**{f'{date_field}__lte': pub_date}) & (
+        Q(**{f'{date_field}__lt': pub_date})
+        | Q(**{date_field: pub_date, f'{id_field}__lt': pk})
+    )
+
+
+def feed_page(user, position, limit):
+    """Страница ленты после позиции (pub_date, id), от новых к старым.
+
+    Разложенные рецепты читаются одним проходом по индексу
+    (user, pub_date, recipe); рецепты популярных авторов
+    берутся напрямую по индексу (author, pub_date, id).
+    """
+    timeline = FeedEntry.objects.filter(
+        after(position, 'pub_date', 'recipe_id'), user=user
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:limit]
+    sources = [list(timeline)]
+    celebrities = celebrity_ids()
+    if celebrities:
+        followed = Subscribe.objects.filter(
+            user=user, author_id__in=celebrities
+        ).values_list('author_id', flat=True).order_by()
+        sources.append(list(
+            Recipe.objects.filter(
+                after(position, 'pub_date', 'id'), author_id__in=followed
+            ).order_by('-pub_date', '-id').values_list(
+                'pub_date', 'id'
+            )[:limit]
+        ))
+    recipe_ids, seen = [], set()
+    for _, recipe_id in heapq.merge(*sources, reverse=True):
+        if recipe_id in seen:
+            continue
+        seen.add(recipe_id)
+        recipe_ids.append(recipe_id)
+        if len(recipe_ids) == limit:
+            break
+    recipes = Recipe.objects.with_user_flags(user).in_bulk(recipe_ids)
+    return [recipes[pk] for pk in recipe_ids if pk in recipes]
@@ -0,0 +1,84 @@
+import re
+from collections import defaultdict
+
+import snowballstemmer
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+from .models import Recipe, RecipeSearchTerm
+
+# Вес слова зависит от того, в каком поле рецепта оно встретилось.
+NAME_WEIGHT = 4
+INGREDIENT_WEIGHT = 2
+TEXT_WEIGHT = 1
+
+MAX_TERM_LENGTH = 64
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+STOP_WORDS = frozenset((
+    'а', 'в', 'во', 'да', 'до', 'для', 'же', 'за', 'и', 'из', 'или', 'к',
+    'как', 'на', 'над', 'не', 'но', 'о', 'об', 'от', 'по', 'под', 'при',
+    'с', 'со', 'то', 'у', 'что',
+))
+
+russian = snowballstemmer.stemmer('russian')
+english = snowballstemmer.stemmer('english')
+
+
+def stems(text):
+    """Разбивает текст на основы слов."""
+    result = []
+    for word in WORD_RE.findall(text.casefold().replace('ё', 'е')):
+        if word in STOP_WORDS or word.isdigit():
+            continue
+        stemmer = russian if CYRILLIC_RE.search(word) else english
+        result.append(stemmer.stemWord(word)[:MAX_TERM_LENGTH])
+    return result
+
+
+def recipe_terms(recipe):
+    terms = defaultdict(int)
+    fields = [(recipe.name, NAME_WEIGHT), (recipe.text, TEXT_WEIGHT)]
+    fields.extend(
+        (ingredient.name, INGREDIENT_WEIGHT)
+        for ingredient in recipe.ingredients.all()
+    )
+    for text, weight in fields:
+        for term in set(stems(text)):
+            terms[term] += weight
+    return terms
+
+
+def index_recipes(recipe_ids):
+    """Перестраивает поисковый индекс для указанных рецептов."""
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    recipes = Recipe.objects.filter(
+        id__in=recipe_ids
+    ).prefetch_related('ingredients')
+    RecipeSearchTerm.objects.filter(recipe_id__in=recipe_ids).delete()
+    RecipeSearchTerm.objects.bulk_create(
+        RecipeSearchTerm(recipe=recipe, term=term, weight=weight)
+        for recipe in recipes
+        for term, weight in recipe_terms(recipe).items()
+    )
+
+
+def search_recipes(queryset, query):
+    """Оставляет рецепты, содержащие все слова запроса, и сортирует
+    их по релевантности."""
+    terms = set(stems(query))
+    if not terms:
+        return queryset
+    matches = RecipeSearchTerm.objects.filter(
+        term__in=terms
+    ).values('recipe').annotate(
+        matched=Count('term'), rank=Sum('weight')
+    ).filter(matched=len(terms))
+    return queryset.filter(
+        id__in=matches.values('recipe')
+    ).annotate(
+        search_rank=Subquery(
+            matches.filter(recipe=OuterRef('pk')).values('rank')
+        )
+    ).order_by('-search_rank', '-pub_date', '-id')
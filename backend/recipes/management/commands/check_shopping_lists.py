@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.versions import bump_versions, shopping_list_version_key
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import expected_items
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """Пересчет сводных списков покупок по корзинам."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не меняя.'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+        drift = 0
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            drift += self.check_batch(
+                user_ids[start:start + BATCH_SIZE], options['dry_run']
+            )
+        if drift:
+            self.stdout.write(self.style.WARNING(
+                f'Расхождений: {drift}'
+                + (' (не исправлены).' if options['dry_run'] else
+                   ' (исправлены).')
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+
+    @transaction.atomic
+    def check_batch(self, user_ids, dry_run):
+        expected = expected_items(user_ids)
+        actual = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects.select_for_update().filter(
+                user_id__in=user_ids
+            )
+        }
+        created, changed, removed = [], [], []
+        for key in expected.keys() | actual.keys():
+            amount = expected.get(key)
+            item = actual.get(key)
+            if item is not None and item.amount == amount:
+                continue
+            self.stdout.write(
+                f'Пользователь {key[0]}, ингредиент {key[1]}: '
+                f'{item.amount if item else 0} вместо {amount or 0}'
+            )
+            if item is None:
+                created.append(ShoppingListItem(
+                    user_id=key[0], ingredient_id=key[1], amount=amount
+                ))
+            elif amount is None:
+                removed.append(item.id)
+            else:
+                item.amount = amount
+                changed.append(item)
+        if not dry_run:
+            ShoppingListItem.objects.bulk_create(created)
+            ShoppingListItem.objects.bulk_update(changed, ['amount'])
+            ShoppingListItem.objects.filter(id__in=removed).delete()
+            bump_versions(*map(shopping_list_version_key, user_ids))
+        return len(created) + len(changed) + len(removed)
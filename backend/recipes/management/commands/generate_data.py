@@ -0,0 +1,113 @@
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.versions import (INGREDIENTS_VERSION, RECIPE_LIST_VERSION,
+                           TAGS_VERSION, bump_versions)
+from recipes.counters import fill_counters
+from recipes.feed import CELEBRITIES_KEY
+from recipes.fulltext import index_recipes
+from recipes.models import FavoriteRecipe, Ingredient, ShoppingCart
+from recipes.pantry import reset_pantry
+from recipes.synthetic import BATCH_SIZE, SyntheticData, batched
+from users.models import Subscribe, User
+
+INDEX_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """Генерация данных для нагрузочного тестирования.
+
+    Пользователи, рецепты с ингредиентами и тегами, избранное, корзины
+    и подписки; популярность рецептов и авторов распределена по Ципфу.
+    При одинаковых seed и параметрах данные получаются одинаковыми.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=50000)
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число избранных рецептов у пользователя.'
+        )
+        parser.add_argument(
+            '--carts', type=float, default=3,
+            help='Среднее число рецептов в корзине пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=float, default=10,
+            help='Среднее число подписок пользователя.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель распределения Ципфа.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк вставлять за один запрос.'
+        )
+        parser.add_argument(
+            '--prefix', default='user',
+            help='Начало имени пользователя, имена: <prefix>0, <prefix>1...'
+        )
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль пользователей; без него войти можно только '
+                 'по токену.'
+        )
+        parser.add_argument(
+            '--skip-index', action='store_true',
+            help='Не строить поисковый индекс рецептов.'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username=f'{prefix}0').exists():
+            raise CommandError(
+                f'Пользователи {prefix}* уже есть, задайте другой --prefix.'
+            )
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        started = time.monotonic()
+        if not Ingredient.objects.exists():
+            call_command('import_data_csv', stdout=self.stdout)
+        data = SyntheticData(
+            options['seed'], options['exponent'], options['batch_size'],
+            log=self.stdout.write
+        )
+        tag_ids = data.tags()
+        images = data.images()
+        user_ids = data.users(options['users'], prefix, options['password'])
+        recipe_ids = data.recipes(
+            options['recipes'], user_ids, tag_ids, images
+        )
+        data.relations(
+            FavoriteRecipe, 'recipe', user_ids, recipe_ids,
+            options['favorites']
+        )
+        data.relations(
+            ShoppingCart, 'recipe', user_ids, recipe_ids, options['carts']
+        )
+        data.relations(
+            Subscribe, 'author', user_ids, user_ids, options['subscriptions']
+        )
+
+        # Сигналы при вставке не срабатывали, заполняем производные
+        # данные так, как их заполнили бы сигналы.
+        self.stdout.write('Счетчики...')
+        fill_counters()
+        data.feed(user_ids)
+        data.shopping_lists(user_ids)
+        if not options['skip_index']:
+            for batch in batched(recipe_ids, INDEX_BATCH_SIZE):
+                index_recipes(batch)
+            self.stdout.write(f'Проиндексировано рецептов: {len(recipe_ids)}')
+        bump_versions(RECIPE_LIST_VERSION, INGREDIENTS_VERSION, TAGS_VERSION)
+        reset_pantry()
+        cache.delete(CELEBRITIES_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.0f} с.'
+        ))
@@ -1,28 +1,140 @@
 import csv
+import json
 import os
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
+from core.versions import INGREDIENTS_VERSION, bump_versions
 from recipes.models import Ingredient
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, "data/ingredients.csv")
+BATCH_SIZE = 5000
+CHUNK_SIZE = 64 * 1024
+MAX_LENGTH = 200
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        yield row[0] if row else '', row[1] if len(row) > 1 else ''
+
+
+def read_json(file):
+    """Читает массив объектов по частям, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив объектов.')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError('Файл JSON поврежден.')
+                break
+            if not isinstance(item, dict):
+                item = {}
+            yield item.get('name', ''), item.get('measurement_unit', '')
+        if not chunk:
+            return
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
 
 
 class Command(BaseCommand):
-    """Загрузка ингредиентов в БД."""
+    """Загрузка ингредиентов в БД.
 
-    def handle(self, *args, **options):
-        with open(os.path.join(DATA_ROOT), "r", encoding="utf-8") as file:
-            file_reader = csv.reader(file)
-            file.seek(0)
+    Повторный запуск не создает дубликатов: строки, которые уже есть
+    в БД, пропускаются.
+    """
 
-            ingredients = [Ingredient(
-                name=row[0], measurement_unit=row[1])for row in file_reader
-            ]
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=DATA_ROOT,
+            help='Файл CSV (название,единица) или JSON.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк обрабатывать за один запрос.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет добавлено.'
+        )
 
-        Ingredient.objects.bulk_create(ingredients)
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError(
+                f'Поддерживаются форматы: {", ".join(READERS)}.'
+            )
+        self.dry_run = options['dry_run']
+        self.inserted = self.skipped = self.invalid = self.read = 0
+        seen = set()
+        batch = []
+        with open(path, "r", encoding="utf-8") as file:
+            for name, unit in reader(file):
+                self.read += 1
+                name, unit = str(name).strip(), str(unit).strip()
+                if not name or not unit or max(
+                    len(name), len(unit)
+                ) > MAX_LENGTH:
+                    self.invalid += 1
+                    continue
+                if (name, unit) in seen:
+                    self.skipped += 1
+                    continue
+                seen.add((name, unit))
+                batch.append((name, unit))
+                if len(batch) == options['batch_size']:
+                    self.import_batch(batch)
+                    batch = []
+        self.import_batch(batch)
 
-        self.stdout.write(
-            self.style.SUCCESS("Данные импортированы в БД.")
+        if self.inserted and not self.dry_run:
+            # bulk_create не отправляет сигналы, индекс поиска
+            # ингредиентов сбрасываем явно.
+            bump_versions(INGREDIENTS_VERSION)
+        # Ингредиент состоит только из ключа (название, единица),
+        # поэтому обновлять у существующих записей нечего.
+        summary = (
+            f'Добавлено: {self.inserted}, обновлено: 0, '
+            f'пропущено: {self.skipped}, с ошибками: {self.invalid}.'
         )
+        if self.dry_run:
+            summary = f'Пробный запуск, БД не изменена. {summary}'
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def import_batch(self, batch):
+        if not batch:
+            return
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in batch}
+        ).values_list('name', 'measurement_unit').order_by())
+        new = [key for key in batch if key not in existing]
+        if self.dry_run:
+            for name, unit in new:
+                self.stdout.write(f'+ {name} ({unit})')
+        else:
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in new),
+                ignore_conflicts=True
+            )
+        self.inserted += len(new)
+        self.skipped += len(batch) - len(new)
+        self.stdout.write(f'Обработано строк: {self.read}')
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, expected_counts
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков рецептов, избранного, корзин и подписчиков."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не меняя.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько строк пересчитывать в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        drift = 0
+        for model, field, related, key in COUNTERS:
+            pks = list(
+                model.objects.order_by('pk').values_list('pk', flat=True)
+            )
+            for start in range(0, len(pks), options['batch_size']):
+                drift += self.check_batch(
+                    model, field, related, key,
+                    pks[start:start + options['batch_size']],
+                    options['dry_run']
+                )
+        if drift:
+            self.stdout.write(self.style.WARNING(
+                f'Расхождений: {drift}'
+                + (' (не исправлены).' if options['dry_run'] else
+                   ' (исправлены).')
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+
+    @transaction.atomic
+    def check_batch(self, model, field, related, key, pks, dry_run):
+        rows = list(model.objects.select_for_update().filter(
+            pk__in=pks
+        ).only('pk', field))
+        expected = expected_counts(related, key, pks)
+        changed = []
+        for row in rows:
+            value = expected.get(row.pk, 0)
+            if getattr(row, field) == value:
+                continue
+            self.stdout.write(
+                f'{model._meta.verbose_name} {row.pk}, {field}: '
+                f'{getattr(row, field)} вместо {value}'
+            )
+            setattr(row, field, value)
+            changed.append(row)
+        if not dry_run:
+            model.objects.bulk_update(changed, [field])
+        return len(changed)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.fulltext import index_recipes
+from recipes.models import Recipe
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """Перестроение поискового индекса рецептов."""
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            index_recipes(recipe_ids[start:start + BATCH_SIZE])
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано рецептов: {len(recipe_ids)}')
+        )
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:26
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('users', 'User', 'recipes_count', 'recipes', 'Recipe', 'author'),
+    ('users', 'User', 'subscribers_count', 'users', 'Subscribe', 'author'),
+    ('recipes', 'Recipe', 'favorites_count',
+     'recipes', 'FavoriteRecipe', 'recipe'),
+    ('recipes', 'Recipe', 'shopping_cart_count',
+     'recipes', 'ShoppingCart', 'recipe'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, name, field, related_app, related_name, key in COUNTERS:
+        model = apps.get_model(app, name)
+        related = apps.get_model(related_app, related_name)
+        totals = related.objects.filter(
+            **{key: models.OuterRef('pk')}
+        ).values(key).annotate(total=models.Count('pk')).values('total')
+        model.objects.update(**{
+            field: Coalesce(models.Subquery(totals), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_feedentry'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    """Оставляет у каждой пары (название, единица) ингредиент с
+    наименьшим id и переносит на него ссылки дубликатов."""
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientRecipe = apps.get_model('recipes', 'IngredientRecipe')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    groups = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in groups:
+        duplicates = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep']).values_list('id', flat=True))
+        for row in IngredientRecipe.objects.filter(
+            ingredient_id__in=duplicates
+        ):
+            # Рецепт уже ссылается на оставшийся ингредиент: количества
+            # складываются в одну строку.
+            kept = IngredientRecipe.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=group['keep']
+            ).first()
+            if kept is None:
+                row.ingredient_id = group['keep']
+                row.save(update_fields=['ingredient_id'])
+            else:
+                kept.amount += row.amount
+                kept.save(update_fields=['amount'])
+                row.delete()
+        for item in ShoppingListItem.objects.filter(
+            ingredient_id__in=duplicates
+        ):
+            kept, created = ShoppingListItem.objects.get_or_create(
+                user_id=item.user_id, ingredient_id=group['keep'],
+                defaults={'amount': 0}
+            )
+            kept.amount += item.amount
+            kept.save(update_fields=['amount'])
+            item.delete()
+        Ingredient.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,11 @@ from django.contrib.auth import get_user_model
 from django.core.validators import (
     MinValueValidator, MaxValueValidator, RegexValidator)
 from django.db import models
+from django.db.models import (Exists, F, OuterRef, Prefetch, Value,
+                              Window)
+from django.db.models.functions import RowNumber
+
+from core.mixins import ChangedFieldsMixin
 
 User = get_user_model()
 
@@ -24,6 +29,12 @@ class Ingredient(models.Model):
         ordering = ['name']
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_unit',
+            )
+        ]
 
     def __str__(self):
         return f'{self.name} {self.measurement_unit}'
@@ -72,7 +83,76 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Планы запросов для выборок рецептов."""
+
+    def with_related(self):
+        """Подтягивает автора, теги и ингредиенты фиксированным
+        числом запросов на всю выборку."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient'
+                ).order_by('id')
+            )
+        )
+
+    def with_user_flags(self, user):
+        """Аннотирует флаги избранного, списка покупок и подписки
+        на автора для текущего пользователя."""
+        if 'is_favorited' in self.query.annotations:
+            return self
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, models.BooleanField()),
+                is_in_shopping_cart=Value(False, models.BooleanField()),
+                author_is_subscribed=Value(False, models.BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            author_is_subscribed=Exists(user.subscriber.filter(
+                author=OuterRef('author')
+            )),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Последние limit рецептов каждого автора одним запросом.
+
+        Возвращает словарь {id автора: [рецепты]}.
+        """
+        queryset = self.filter(author_id__in=author_ids).order_by(
+            '-pub_date', '-id'
+        )
+        if limit is not None:
+            # Django 3.2 не умеет фильтровать по оконной функции,
+            # поэтому оборачиваем запрос в подзапрос вручную.
+            sql, params = queryset.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('id').desc()),
+                )
+            ).query.sql_with_params()
+            queryset = self.model.objects.raw(
+                f'SELECT * FROM ({sql}) ranked '
+                'WHERE ranked.row_number <= %s '
+                'ORDER BY ranked.pub_date DESC, ranked.id DESC',
+                (*params, limit)
+            )
+        recipes = {author_id: [] for author_id in author_ids}
+        for recipe in queryset:
+            recipes[recipe.author_id].append(recipe)
+        return recipes
+
+
+class Recipe(ChangedFieldsMixin, models.Model):
     """ Модель Рецепт."""
     author = models.ForeignKey(
         User,
@@ -112,11 +192,39 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном',
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок',
+    )
+
+    COUNTER_FIELDS = ('favorites_count', 'shopping_cart_count')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='recipe_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name[:CROP_TEXT]
@@ -211,3 +319,113 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил в Список покупок {self.recipe}.'
+
+
+class ShoppingListItem(models.Model):
+    """ Модель Позиция сводного списка покупок."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Покупатель'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Сводный список покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shoppinglist_ingredient',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}.'
+
+
+class FeedEntry(models.Model):
+    """ Модель Запись ленты подписок."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_recipe',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'recipe'],
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}.'
+
+
+class RecipeSearchTerm(models.Model):
+    """ Модель Поисковый индекс рецептов."""
+    term = models.CharField(
+        verbose_name='Основа слова',
+        max_length=64
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Рецепт'
+    )
+    weight = models.PositiveSmallIntegerField(
+        verbose_name='Вес',
+    )
+
+    class Meta:
+        verbose_name = 'Поисковый терм'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'recipe'],
+                name='unique_term_recipe',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.term} -> {self.recipe}'
@@ -0,0 +1,160 @@
+import heapq
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict, namedtuple
+
+from django.core.cache import cache
+
+from .models import IngredientRecipe
+
+PANTRY_EPOCH = 'pantry:epoch'
+PANTRY_VERSION = 'pantry:version'
+CHANGE_KEY = 'pantry:change:{}'
+# Сколько последних изменений хранится в кеше. Воркер, отставший
+# сильнее, перестраивает индекс целиком.
+CHANGE_LOG_SIZE = 1000
+CHANGE_TIMEOUT = 60 * 60
+
+Snapshot = namedtuple('Snapshot', 'postings required')
+
+
+def record_change(recipe_id):
+    """Записывает изменение состава рецепта в общий журнал."""
+    cache.add(PANTRY_EPOCH, uuid.uuid4().hex, timeout=None)
+    cache.add(PANTRY_VERSION, 0, timeout=None)
+    version = cache.incr(PANTRY_VERSION)
+    cache.set(CHANGE_KEY.format(version), recipe_id, CHANGE_TIMEOUT)
+
+
+def reset_pantry():
+    """Новая эпоха: все воркеры перестроят индекс целиком. Для данных,
+    загруженных в обход сигналов."""
+    cache.set(PANTRY_EPOCH, uuid.uuid4().hex, timeout=None)
+
+
+class PantryIndex:
+    """Инвертированный индекс ингредиент -> рецепты в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для каждого рецепта - массив нужных ингредиентов.
+    Изменения других воркеров подтягиваются из журнала в кеше
+    и применяются только к затронутым рецептам.
+
+    Оба словаря лежат в одном снимке. Изменения собираются в копии,
+    и снимок заменяется целиком, поэтому поиск без блокировки всегда
+    видит согласованные данные.
+    """
+
+    def __init__(self):
+        self.epoch = None
+        self.version = None
+        self.snapshot = Snapshot({}, {})
+        self.lock = threading.Lock()
+
+    def build(self):
+        postings = defaultdict(lambda: array('q'))
+        required = defaultdict(lambda: array('q'))
+        rows = IngredientRecipe.objects.order_by(
+            'recipe_id', 'ingredient_id'
+        ).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows.iterator():
+            postings[ingredient_id].append(recipe_id)
+            required[recipe_id].append(ingredient_id)
+        return Snapshot(dict(postings), dict(required))
+
+    def apply(self, recipe_ids):
+        """Переиндексирует только указанные рецепты.
+
+        Копируются словари и затронутые массивы, прежний снимок
+        не меняется.
+        """
+        postings, required = map(dict, self.snapshot)
+        copied = set()
+
+        def posting(ingredient_id):
+            if ingredient_id not in copied:
+                copied.add(ingredient_id)
+                postings[ingredient_id] = array(
+                    'q', postings.get(ingredient_id, ())
+                )
+            return postings[ingredient_id]
+
+        for recipe_id in recipe_ids:
+            for ingredient_id in required.pop(recipe_id, ()):
+                found = posting(ingredient_id)
+                del found[bisect_left(found, recipe_id)]
+        rows = IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('ingredient_id').values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            # Рецепт уже удален из копии, массив создается заново.
+            required.setdefault(recipe_id, array('q')).append(ingredient_id)
+            insort(posting(ingredient_id), recipe_id)
+        self.snapshot = Snapshot(postings, required)
+
+    def actual(self):
+        """Возвращает индекс, догнавший общий журнал изменений."""
+        state = cache.get_many([PANTRY_EPOCH, PANTRY_VERSION])
+        epoch = state.get(PANTRY_EPOCH)
+        version = state.get(PANTRY_VERSION, 0)
+        if epoch == self.epoch and version == self.version:
+            return self
+        with self.lock:
+            # Версия меньше известной: счетчик вытеснен из кеша
+            # и начат заново, журнал с прежними номерами не годится.
+            if (epoch != self.epoch or self.version is None
+                    or version < self.version):
+                self.rebuild(epoch, version)
+            elif version != self.version:
+                self.catch_up(epoch, version)
+        return self
+
+    def rebuild(self, epoch, version):
+        self.snapshot = self.build()
+        self.epoch, self.version = epoch, version
+
+    def catch_up(self, epoch, version):
+        if version - self.version > CHANGE_LOG_SIZE:
+            return self.rebuild(epoch, version)
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(self.version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            # Часть журнала вытеснена из кеша.
+            return self.rebuild(epoch, version)
+        self.apply(set(changes.values()))
+        self.version = version
+
+    def search(self, ingredient_ids, limit):
+        """Ранжирует рецепты по доле покрытых ингредиентов.
+
+        Возвращает список (id рецепта, число совпавших ингредиентов,
+        id недостающих ингредиентов).
+        """
+        postings, required = self.snapshot
+        ingredient_ids = set(ingredient_ids)
+        matched = Counter()
+        for ingredient_id in ingredient_ids:
+            matched.update(postings.get(ingredient_id, ()))
+        best = heapq.nsmallest(
+            limit, matched.items(),
+            key=lambda item: (
+                -item[1] / len(required[item[0]]),
+                len(required[item[0]]) - item[1],
+                -item[0],
+            )
+        )
+        return [
+            (recipe_id, count, [
+                ingredient_id for ingredient_id in required[recipe_id]
+                if ingredient_id not in ingredient_ids
+            ])
+            for recipe_id, count in best
+        ]
+
+
+pantry_index = PantryIndex()
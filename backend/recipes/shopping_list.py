@@ -0,0 +1,87 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Sum
+
+from core.versions import bump_versions, shopping_list_version_key
+
+from .models import IngredientRecipe, ShoppingCart, ShoppingListItem
+
+
+def recipe_amounts(recipe_id):
+    return Counter(dict(
+        IngredientRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount')
+    ))
+
+
+@transaction.atomic
+def apply_deltas(user_ids, deltas):
+    """Прибавляет к сводным спискам пользователей изменения
+    количества ингредиентов {id ингредиента: дельта}."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    # Недостающие позиции сначала вставляются пустыми: параллельное
+    # первое добавление того же ингредиента не падает на уникальном
+    # индексе, а ждет блокировки строки и прибавляет к ней.
+    ShoppingListItem.objects.bulk_create((
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, amount=0
+        )
+        for user_id in user_ids
+        for ingredient_id, delta in deltas.items() if delta > 0
+    ), ignore_conflicts=True)
+    changed, removed = [], []
+    for item in ShoppingListItem.objects.select_for_update().filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    ):
+        amount = item.amount + deltas[item.ingredient_id]
+        if amount > 0:
+            item.amount = amount
+            changed.append(item)
+        else:
+            removed.append(item.id)
+    ShoppingListItem.objects.bulk_update(changed, ['amount'])
+    ShoppingListItem.objects.filter(id__in=removed).delete()
+    bump_versions(*map(shopping_list_version_key, user_ids))
+
+
+def add_recipe(user_id, recipe_id):
+    """Рецепт добавлен в корзину пользователя."""
+    apply_deltas([user_id], recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_id, recipe_id):
+    """Рецепт удален из корзины пользователя."""
+    apply_deltas([user_id], {
+        ingredient_id: -amount
+        for ingredient_id, amount in recipe_amounts(recipe_id).items()
+    })
+
+
+def change_recipe(recipe_id, deltas):
+    """Состав рецепта изменился: правим списки всех пользователей,
+    у которых он в корзине."""
+    apply_deltas(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True),
+        deltas
+    )
+
+
+def expected_items(user_ids):
+    """Сводный список, посчитанный заново по корзинам."""
+    rows = IngredientRecipe.objects.filter(
+        recipe__shopping_cart__user_id__in=user_ids
+    ).values(
+        'recipe__shopping_cart__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).order_by()
+    return {
+        (row['recipe__shopping_cart__user_id'], row['ingredient_id']):
+            row['total']
+        for row in rows
+    }
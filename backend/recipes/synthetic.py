@@ -0,0 +1,281 @@
+import csv
+import io
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from PIL import Image
+
+from users.models import Subscribe, User
+
+from .feed import BACKFILL_SIZE
+from .models import (FeedEntry, Ingredient, IngredientRecipe, Recipe,
+                     ShoppingListItem, Tag)
+from .shopping_list import expected_items
+
+BATCH_SIZE = 10000
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+# Даты не зависят от момента запуска, чтобы данные были одинаковыми
+# при одинаковом seed.
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+PERIOD = timedelta(days=365)
+IMAGES = 8
+IMAGE_PATH = 'recipes/images/synthetic-{}.png'
+FIRST_NAMES = (
+    'Анна', 'Иван', 'Мария', 'Петр', 'Елена', 'Алексей', 'Ольга', 'Дмитрий',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев',
+)
+DISHES = (
+    'Салат', 'Суп', 'Запеканка', 'Паста', 'Пирог', 'Рагу', 'Омлет', 'Соус',
+)
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(model, fields, rows, batch_size=BATCH_SIZE):
+    """Вставляет строки-кортежи значений полей fields пачками.
+
+    В PostgreSQL через COPY, в остальных базах через executemany.
+    Сигналы, save() и auto_now не вызываются. Возвращает число строк.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in fields]
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(field.column) for field in fields)
+    count = 0
+    for batch in batched(rows, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+            else:
+                cursor.executemany(
+                    f'INSERT INTO {table} ({columns}) '
+                    f'VALUES ({", ".join(["%s"] * len(fields))})',
+                    [
+                        [field.get_db_prep_save(value, connection)
+                         for field, value in zip(fields, row)]
+                        for row in batch
+                    ]
+                )
+        count += len(batch)
+    return count
+
+
+def new_ids(model, after):
+    return list(model.objects.filter(pk__gt=after).order_by(
+        'pk'
+    ).values_list('pk', flat=True))
+
+
+def last_id(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+class Zipf:
+    """Выбор по закону Ципфа: k-й по популярности элемент выбирается
+    в k**exponent раз реже первого. Порядок популярности случаен."""
+
+    def __init__(self, rnd, population, exponent):
+        self.rnd = rnd
+        self.population = list(population)
+        rnd.shuffle(self.population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ))
+
+    def sample(self, count):
+        """До count разных элементов, популярные - чаще."""
+        return set(self.rnd.choices(
+            self.population, cum_weights=self.cum_weights, k=count
+        ))
+
+
+class SyntheticData:
+    """Генератор данных для нагрузочного тестирования.
+
+    Результат определяется seed и параметрами. Данные вставляются
+    пачками в обход сигналов, поэтому производные таблицы (счетчики,
+    ленты, сводные списки покупок) заполняются отдельными шагами.
+    """
+
+    def __init__(self, seed, exponent=1.1, batch_size=BATCH_SIZE,
+                 log=print):
+        self.rnd = random.Random(seed)
+        self.exponent = exponent
+        self.batch_size = batch_size
+        self.log = log
+
+    def insert(self, model, fields, rows):
+        count = bulk_insert(model, fields, rows, self.batch_size)
+        self.log(f'{model._meta.verbose_name_plural}: {count}')
+        return count
+
+    def zipf(self, population):
+        return Zipf(self.rnd, population, self.exponent)
+
+    def count(self, mean, limit):
+        """Число связей у пользователя: у большинства мало, у
+        немногих много."""
+        if mean <= 0:
+            return 0
+        return min(int(self.rnd.expovariate(1 / mean)), limit)
+
+    def tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in TAGS
+            )
+        return list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+
+    def images(self):
+        """Заглушки картинок рецептов, создаются один раз."""
+        paths = []
+        for number in range(IMAGES):
+            path = IMAGE_PATH.format(number)
+            if not default_storage.exists(path):
+                # Свой генератор: картинки могли остаться от прошлого
+                # запуска, и общий seed не должен от этого зависеть.
+                color = random.Random(number).randbytes(3)
+                buffer = io.BytesIO()
+                Image.new('RGB', (64, 48), tuple(color)).save(buffer, 'PNG')
+                default_storage.save(path, ContentFile(buffer.getvalue()))
+            paths.append(path)
+        return paths
+
+    def users(self, count, prefix, password=None):
+        first = last_id(User)
+        password = make_password(password)
+        self.insert(User, (
+            'username', 'email', 'first_name', 'last_name', 'password',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+            'is_subcribed', 'recipes_count', 'subscribers_count',
+        ), (
+            (
+                f'{prefix}{number}', f'{prefix}{number}@example.com',
+                self.rnd.choice(FIRST_NAMES), self.rnd.choice(LAST_NAMES),
+                password, False, False, True,
+                START - timedelta(seconds=count - number),
+                False, 0, 0,
+            )
+            for number in range(count)
+        ))
+        return new_ids(User, first)
+
+    def recipes(self, count, user_ids, tag_ids, images):
+        ingredients = dict(
+            Ingredient.objects.order_by('pk').values_list('pk', 'name')
+        )
+        authors = self.zipf(user_ids)
+        popular = self.zipf(ingredients)
+        first = last_id(Recipe)
+        plan = []
+
+        def rows():
+            for number in range(count):
+                ingredient_ids = tuple(
+                    sorted(popular.sample(self.rnd.randint(3, 12)))
+                )
+                plan.append(ingredient_ids)
+                names = [ingredients[pk] for pk in ingredient_ids]
+                pub_date = START + PERIOD * number / count
+                yield (
+                    authors.sample(1).pop(),
+                    f'{self.rnd.choice(DISHES)}: {self.rnd.choice(names)}',
+                    self.rnd.choice(images),
+                    f'Понадобится: {", ".join(names)}. ' * 3,
+                    self.rnd.randint(1, 180),
+                    pub_date, pub_date, 0, 0,
+                )
+
+        self.insert(Recipe, (
+            'author', 'name', 'image', 'text', 'cooking_time',
+            'pub_date', 'updated_at', 'favorites_count',
+            'shopping_cart_count',
+        ), rows())
+        recipe_ids = new_ids(Recipe, first)
+        self.insert(IngredientRecipe, ('recipe', 'ingredient', 'amount'), (
+            (recipe_id, ingredient_id, self.rnd.randint(1, 500))
+            for recipe_id, ingredient_ids in zip(recipe_ids, plan)
+            for ingredient_id in ingredient_ids
+        ))
+        tags = self.zipf(tag_ids)
+        self.insert(Recipe.tags.through, ('recipe', 'tag'), (
+            (recipe_id, tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in tags.sample(self.rnd.randint(1, len(tag_ids)))
+        ))
+        return recipe_ids
+
+    def relations(self, model, field, user_ids, targets, mean):
+        """Связи пользователей с популярными по Ципфу целями."""
+        if not targets:
+            return
+        popular = self.zipf(targets)
+        limit = len(targets)
+        self.insert(model, ('user', field), (
+            (user_id, target)
+            for user_id in user_ids
+            for target in popular.sample(self.count(mean, limit))
+            if target != user_id or field != 'author'
+        ))
+
+    def feed(self, user_ids):
+        """Ленты подписок такие же, как после подписки через API."""
+        celebrities = set(User.objects.filter(
+            subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('pk', flat=True))
+        recent = defaultdict(list)
+        for author_id, recipe_id, pub_date in Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('author_id', 'id', 'pub_date').iterator():
+            if (author_id not in celebrities
+                    and len(recent[author_id]) < BACKFILL_SIZE):
+                recent[author_id].append((recipe_id, pub_date))
+        subscriptions = Subscribe.objects.filter(
+            user_id__gte=user_ids[0], user_id__lte=user_ids[-1]
+        ).values_list('user_id', 'author_id').order_by()
+        self.insert(FeedEntry, ('user', 'recipe', 'author', 'pub_date'), (
+            (user_id, recipe_id, author_id, pub_date)
+            for user_id, author_id in subscriptions.iterator()
+            for recipe_id, pub_date in recent.get(author_id, ())
+        ))
+
+    def shopping_lists(self, user_ids):
+        def rows():
+            for batch in batched(user_ids, 500):
+                for (user_id, ingredient_id), amount in expected_items(
+                    batch
+                ).items():
+                    yield user_id, ingredient_id, amount
+
+        self.insert(ShoppingListItem, ('user', 'ingredient', 'amount'), rows())
@@ -1,27 +1,39 @@
 from django.contrib import admin
 
+from core.admin_tools import AutocompleteFilter, LargeTableAdmin
+
 from .models import Subscribe, User
 
 EMPTY_VALUE = '-пусто-'
 
 
+class SubscribeAuthorFilter(AutocompleteFilter):
+    title = 'Автор'
+    field_name = 'author'
+
+
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     list_display = (
         'id',
         'username',
         'first_name',
         'last_name',
         'email',
+        'recipes_count',
+        'subscribers_count',
     )
-    search_fields = ('first_name', 'last_name',)
-    list_filter = ('username', 'email',)
+    readonly_fields = ('recipes_count', 'subscribers_count')
+    # username и email уникальны: фильтр по ним - это поиск.
+    search_fields = ('username', 'email', 'first_name', 'last_name',)
     empty_value_display = EMPTY_VALUE
 
 
 @admin.register(Subscribe)
-class SubscribeAdmin(admin.ModelAdmin):
+class SubscribeAdmin(LargeTableAdmin):
     list_display = ('user', 'author',)
-    search_fields = ('user',)
-    list_filter = ('author',)
+    list_select_related = ('user', 'author',)
+    search_fields = ('user__username', 'user__email',)
+    list_filter = (SubscribeAuthorFilter,)
+    autocomplete_fields = ('user', 'author',)
     empty_value_display = EMPTY_VALUE
@@ -1,12 +1,15 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.mixins import ChangedFieldsMixin
 
-class User(AbstractUser):
+
+class User(ChangedFieldsMixin, AbstractUser):
     """Модель Пользователя."""
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username', ]
+    COUNTER_FIELDS = ('recipes_count', 'subscribers_count')
 
     email = models.EmailField(
         unique=True,
@@ -33,6 +36,16 @@ class User(AbstractUser):
     is_subcribed = models.BooleanField(
         default=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов',
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков',
+    )
 
     class Meta:
         ordering = ['username']
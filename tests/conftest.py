@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import replicas
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix
+):
+    """Реплика для тестов - отдельная база SQLite в памяти, а не
+    зеркало default, чтобы было видно, откуда прочитаны данные."""
+    settings.DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:',
+    }
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    cache.clear()
+    replicas._health.clear()
+    yield
+    cache.clear()
+
+
+def create_user(username, using='default', **fields):
+    return User.objects.db_manager(using).create_user(
+        username=username, email=f'{username}@example.com',
+        first_name='Имя', last_name='Фамилия', password='Pa$$w0rd-123',
+        **fields
+    )
+
+
+def client_for(user):
+    client = APIClient()
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def create_recipe(client, tags, ingredients, **fields):
+    """Создает рецепт через API; ingredients - пары (ингредиент,
+    количество)."""
+    response = client.post('/api/recipes/', {
+        'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+        'image': IMAGE,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': amount}
+            for ingredient, amount in ingredients
+        ],
+        **fields,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    return response.json()['id']
+
+
+@pytest.fixture
+def user():
+    return create_user('user')
+
+
+@pytest.fixture
+def author():
+    return create_user('author')
+
+
+@pytest.fixture
+def user_client(user):
+    return client_for(user)
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def commit(django_capture_on_commit_callbacks):
+    """Выполняет обработчики on_commit, как после настоящего коммита,
+    включая добавленные самими обработчиками."""
+    @contextmanager
+    def committed():
+        with django_capture_on_commit_callbacks() as callbacks:
+            yield
+        while callbacks:
+            with django_capture_on_commit_callbacks() as added:
+                for callback in callbacks:
+                    callback()
+            callbacks = added
+    return committed
+
+
+@pytest.fixture
+def author_client(author):
+    return client_for(author)
+
+
+@pytest.fixture
+def tags():
+    # Теги и ингредиенты создаются не в алфавитном порядке, чтобы
+    # расхождение в сортировке было заметно.
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Ужин', '#8775D2', 'dinner'),
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (
+            ('яйца', 'шт'), ('мука', 'г'), ('молоко', 'мл'), ('соль', 'г'),
+        )
+    ]
@@ -0,0 +1,76 @@
+import pytest
+from django.test import Client
+
+from core.admin_tools import EstimatedCountPaginator
+from recipes.models import FavoriteRecipe
+from users.models import Subscribe, User
+
+from .conftest import create_recipe, create_user
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def staff_client():
+    client = Client()
+    client.force_login(create_user('admin', is_staff=True, is_superuser=True))
+    return client
+
+
+@pytest.fixture
+def recipe(author_client, user, author, tags, ingredients):
+    recipe = create_recipe(author_client, tags[:1], [(ingredients[0], 1)])
+    FavoriteRecipe.objects.create(user=user, recipe_id=recipe)
+    Subscribe.objects.create(user=user, author=author)
+    return recipe
+
+
+@pytest.mark.parametrize('url', [
+    '/admin/recipes/recipe/',
+    '/admin/recipes/favoriterecipe/',
+    '/admin/recipes/shoppingcart/',
+    '/admin/users/user/',
+    '/admin/users/subscribe/',
+])
+def test_changelist(staff_client, recipe, url):
+    response = staff_client.get(url)
+
+    assert response.status_code == 200
+    assert b'select2' in response.content
+
+
+def test_autocomplete_filter(staff_client, recipe, author, user):
+    response = staff_client.get(
+        '/admin/recipes/recipe/', {'author__id__exact': author.id}
+    )
+    assert response.status_code == 200
+    assert [
+        item.id for item in response.context['cl'].result_list
+    ] == [recipe]
+
+    response = staff_client.get(
+        '/admin/recipes/recipe/', {'author__id__exact': user.id}
+    )
+    assert list(response.context['cl'].result_list) == []
+
+    response = staff_client.get(
+        '/admin/users/subscribe/', {'author__id__exact': user.id}
+    )
+    assert list(response.context['cl'].result_list) == []
+
+
+def test_autocomplete_filter_rejects_garbage(staff_client, recipe):
+    response = staff_client.get(
+        '/admin/recipes/recipe/', {'author__id__exact': 'x'}
+    )
+
+    # Админка сбрасывает неверные параметры фильтра.
+    assert response.status_code == 302
+
+
+def test_exact_count_without_postgresql(user, author):
+    paginator = EstimatedCountPaginator(User.objects.order_by('id'), 1)
+
+    assert paginator.count == 2
+    assert EstimatedCountPaginator(User.objects.none(), 1).count == 0
+    assert EstimatedCountPaginator([1, 2, 3], 1).count == 3
@@ -0,0 +1,70 @@
+import pytest
+from django.core.cache import cache
+from django.utils.translation import gettext as _
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache_key
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+ME = '/api/users/me/'
+
+
+@pytest.fixture
+def key(user, user_client):
+    """Ключ токена user_client; первый запрос кладет его в кеш."""
+    response = user_client.get(ME)
+    assert response.status_code == 200, response.content
+    return Token.objects.get(user=user).key
+
+
+def test_token_is_cached_without_password(key, user_client, user):
+    values, _ = cache.get(token_cache_key(key))
+    assert values['id'] == user.id
+    assert 'password' not in values
+
+    response = user_client.get(ME)
+
+    assert response.status_code == 200, response.content
+    assert response.json()['username'] == 'user'
+
+
+def test_logout_revokes_cached_token(key, user_client):
+    response = user_client.post('/api/auth/token/logout/')
+    assert response.status_code == 204, response.content
+
+    assert user_client.get(ME).status_code == 401
+
+
+def test_deactivation_revokes_cached_token(key, user_client, user):
+    user.is_active = False
+    user.save()
+
+    assert user_client.get(ME).status_code == 401
+
+
+def test_profile_change_is_visible(key, user_client, user):
+    user.first_name = 'Новое'
+    user.save()
+
+    assert user_client.get(ME).json()['first_name'] == 'Новое'
+
+
+def test_deleted_user_is_rejected(key, user_client, user):
+    user.delete()
+
+    assert user_client.get(ME).status_code == 401
+
+
+def test_inactive_user_from_cache_is_rejected(key, user_client, user):
+    # Запись, заполненная запросом, который начался до деактивации.
+    User.objects.filter(id=user.id).update(is_active=False)
+    values, created = cache.get(token_cache_key(key))
+    values['is_active'] = False
+    cache.set(token_cache_key(key), (values, created))
+
+    response = user_client.get(ME)
+
+    assert response.status_code == 401
+    assert response.json()['detail'] == _('User inactive or deleted.')
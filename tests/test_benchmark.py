@@ -0,0 +1,50 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.management.commands.benchmark_api import (BASELINE_PATH, ENDPOINTS,
+                                                   Command)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def results():
+    # На 50-й странице списка по 6 рецептов нужно 300 рецептов.
+    call_command('generate_data', users=20, recipes=300, stdout=StringIO())
+    return Command(stdout=StringIO()).run_endpoints(repeat=2)
+
+
+def test_every_endpoint_measured(results):
+    assert list(results) == [name for name, _, _ in ENDPOINTS]
+    for result in results.values():
+        assert result['queries'] <= result['cold_queries']
+        assert 0 < result['p50_ms'] <= result['p95_ms']
+        assert result['peak_memory_kb'] > 0
+
+
+def test_baseline_covers_every_endpoint():
+    with open(BASELINE_PATH, encoding='utf-8') as file:
+        baseline = json.load(file)
+
+    assert set(baseline) == {name for name, _, _ in ENDPOINTS}
+
+
+def test_regressions_are_reported():
+    budget = {'cold_queries': 5, 'queries': 2, 'p95_ms': 10}
+    compare = Command().compare
+
+    slow = {'list': dict(budget, p95_ms=14)}
+    assert compare(slow, {'list': budget}, 1.5, 0) == []
+    assert compare(slow, {'list': budget}, 1.2, 0) == [
+        'list: p95 14 мс, бюджет 10 мс x 1.2'
+    ]
+    # Небольшой рост в мс у быстрых запросов регрессией не считается.
+    assert compare(slow, {'list': budget}, 1.2, 5) == []
+    errors = compare({'list': dict(budget, queries=3)}, {'list': budget},
+                     1.5, 5)
+    assert errors == ['list: 3 запросов, бюджет 2']
+    # Нового эндпоинта нет в базовой линии - сравнивать не с чем.
+    assert compare({'new': budget}, {}, 1.5, 5) == []
@@ -0,0 +1,106 @@
+import pytest
+from django.utils.http import http_date
+
+from api.serializers import (IngredientSerializer, RecipeRetriveSerializer,
+                             TagSerializer)
+from recipes.models import Ingredient, Recipe, Tag
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe(author_client, tags, ingredients, commit):
+    with commit():
+        return create_recipe(author_client, tags[:1], [(ingredients[0], 1)])
+
+
+def forbid_rendering(monkeypatch):
+    """Ответ 304 не должен сериализовать ни одного объекта."""
+    def fail(*args, **kwargs):
+        raise AssertionError('Тело ответа сериализовано.')
+
+    for serializer in (TagSerializer, IngredientSerializer,
+                       RecipeRetriveSerializer):
+        monkeypatch.setattr(serializer, 'to_representation', fail)
+
+
+def revalidate(client, url, etag, monkeypatch):
+    with monkeypatch.context() as patched:
+        forbid_rendering(patched)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+
+@pytest.mark.parametrize('url', ['/api/tags/', '/api/tags/{tag}/'])
+def test_tags(anonymous_client, tags, commit, monkeypatch, url):
+    url = url.format(tag=tags[0].id)
+    etag = anonymous_client.get(url)['ETag']
+
+    revalidate(anonymous_client, url, etag, monkeypatch)
+
+    with commit():
+        tag = Tag.objects.get(id=tags[0].id)
+        tag.name = 'Полдник'
+        tag.save()
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_ingredient(anonymous_client, ingredients, commit, monkeypatch):
+    url = f'/api/ingredients/{ingredients[0].id}/'
+    etag = anonymous_client.get(url)['ETag']
+
+    revalidate(anonymous_client, url, etag, monkeypatch)
+
+    with commit():
+        Ingredient.objects.create(name='сахар', measurement_unit='г')
+    assert anonymous_client.get(
+        url, HTTP_IF_NONE_MATCH=etag
+    ).status_code == 200
+
+
+def test_recipe_anonymous(anonymous_client, author_client, recipe, commit,
+                          monkeypatch):
+    url = f'/api/recipes/{recipe}/'
+    response = anonymous_client.get(url)
+    etag = response['ETag']
+    updated_at = Recipe.objects.get(id=recipe).updated_at
+    assert response['Last-Modified'] == http_date(updated_at.timestamp())
+    assert 'Authorization' in response['Vary']
+
+    revalidate(anonymous_client, url, etag, monkeypatch)
+    with monkeypatch.context() as patched:
+        forbid_rendering(patched)
+        assert anonymous_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+
+    with commit():
+        author_client.patch(url, {'name': 'Новое имя'}, format='json')
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Новое имя'
+    assert Recipe.objects.get(id=recipe).updated_at > updated_at
+
+
+def test_recipe_follows_user_flags(user_client, anonymous_client, recipe,
+                                   commit, monkeypatch):
+    url = f'/api/recipes/{recipe}/'
+    etag = user_client.get(url)['ETag']
+    assert anonymous_client.get(url)['ETag'] != etag
+
+    revalidate(user_client, url, etag, monkeypatch)
+
+    with commit():
+        user_client.post(f'/api/recipes/{recipe}/favorite/')
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['is_favorited']
+
+
+def test_missing_recipe(anonymous_client):
+    assert anonymous_client.get('/api/recipes/999/').status_code == 404
@@ -0,0 +1,91 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models.signals import post_save
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscribe, User
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe(author_client, tags, ingredients):
+    return Recipe.objects.get(
+        id=create_recipe(author_client, tags[:1], [(ingredients[0], 10)])
+    )
+
+
+def counts(recipe):
+    recipe = Recipe.objects.get(id=recipe.id)
+    return recipe.favorites_count, recipe.shopping_cart_count
+
+
+def test_counters_follow_writes(user_client, user, author, recipe):
+    assert User.objects.get(id=author.id).recipes_count == 1
+
+    user_client.post(f'/api/recipes/{recipe.id}/favorite/')
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    user_client.post(f'/api/users/{author.id}/subscribe/')
+
+    assert counts(recipe) == (1, 1)
+    assert User.objects.get(id=author.id).subscribers_count == 1
+
+    user_client.delete(f'/api/recipes/{recipe.id}/favorite/')
+    user_client.delete(f'/api/recipes/{recipe.id}/shopping_cart/')
+    user_client.delete(f'/api/users/{author.id}/subscribe/')
+
+    assert counts(recipe) == (0, 0)
+    assert User.objects.get(id=author.id).subscribers_count == 0
+
+
+def test_stale_save_keeps_counters(user, recipe):
+    stale = Recipe.objects.get(id=recipe.id)
+    FavoriteRecipe.objects.create(user=user, recipe=recipe)
+
+    stale.name = 'Новое имя'
+    stale.save()
+
+    assert counts(recipe) == (1, 0)
+    assert Recipe.objects.get(id=recipe.id).name == 'Новое имя'
+
+
+def test_unchanged_save_is_not_skipped(user, recipe):
+    stale = Recipe.objects.get(id=recipe.id)
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    saved = []
+
+    def receiver(sender, instance, update_fields, **kwargs):
+        saved.append(update_fields)
+
+    post_save.connect(receiver, sender=Recipe)
+    try:
+        stale.save()
+    finally:
+        post_save.disconnect(receiver, sender=Recipe)
+
+    [update_fields] = saved
+    assert 'name' in update_fields
+    assert 'shopping_cart_count' not in update_fields
+    assert counts(recipe) == (0, 1)
+
+
+def test_recount_fixes_drift(user, author, recipe):
+    FavoriteRecipe.objects.create(user=user, recipe=recipe)
+    Subscribe.objects.create(user=user, author=author)
+    Recipe.objects.filter(id=recipe.id).update(
+        favorites_count=5, shopping_cart_count=3
+    )
+    User.objects.filter(id=author.id).update(subscribers_count=0)
+
+    output = StringIO()
+    call_command('recount_counters', '--dry-run', stdout=output)
+    assert 'Расхождений: 3 (не исправлены)' in output.getvalue()
+    assert counts(recipe) == (5, 3)
+
+    call_command('recount_counters', stdout=StringIO())
+    assert counts(recipe) == (1, 0)
+    assert User.objects.get(id=author.id).subscribers_count == 1
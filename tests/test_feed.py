@@ -0,0 +1,114 @@
+import pytest
+from django.core.cache import cache
+
+from recipes.feed import CELEBRITIES_KEY
+from recipes.models import FeedEntry
+from users.models import Subscribe
+
+from .conftest import client_for, create_recipe, create_user
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def publish(author_client, tags, ingredients, commit):
+    def publish(client=author_client, name='Рецепт'):
+        with commit():
+            return create_recipe(
+                client, tags[:1], [(ingredients[0], 1)], name=name
+            )
+    return publish
+
+
+@pytest.fixture
+def subscribe(user_client, commit):
+    def subscribe(author, client=user_client):
+        with commit():
+            response = client.post(f'/api/users/{author.id}/subscribe/')
+        assert response.status_code == 201, response.content
+    return subscribe
+
+
+@pytest.fixture
+def unsubscribe(user_client, commit):
+    def unsubscribe(author, client=user_client):
+        with commit():
+            response = client.delete(f'/api/users/{author.id}/subscribe/')
+        assert response.status_code == 204, response.content
+    return unsubscribe
+
+
+def feed(client, **params):
+    """Все страницы ленты по курсору."""
+    recipe_ids = []
+    response = client.get('/api/recipes/feed/', {'cursor': '', **params})
+    while True:
+        assert response.status_code == 200, response.content
+        data = response.json()
+        recipe_ids.extend(item['id'] for item in data['results'])
+        if not data['next']:
+            return recipe_ids
+        response = client.get(data['next'])
+
+
+def test_fan_out_and_prune(user_client, author, publish, subscribe,
+                           unsubscribe):
+    subscribe(author)
+    recipes = [publish(name=f'Рецепт {number}') for number in range(3)]
+
+    assert feed(user_client) == recipes[::-1]
+    assert FeedEntry.objects.filter(recipe_id__in=recipes).count() == 3
+
+    unsubscribe(author)
+
+    assert feed(user_client) == []
+    assert not FeedEntry.objects.exists()
+
+
+def test_backfill_on_subscribe(user_client, author, publish, subscribe):
+    recipes = [publish() for _ in range(3)]
+
+    subscribe(author)
+
+    assert feed(user_client) == recipes[::-1]
+
+
+def test_pages_do_not_overlap(user_client, author, publish, subscribe):
+    subscribe(author)
+    recipes = [publish() for _ in range(5)]
+
+    assert feed(user_client, limit=2) == recipes[::-1]
+
+
+def test_celebrity_is_merged_on_read(settings, user_client, author, publish,
+                                     subscribe):
+    settings.FEED_FANOUT_LIMIT = 1
+    other = create_user('other')
+    subscribe(author)
+    subscribe(other)
+    Subscribe.objects.create(user=create_user('fan'), author=other)
+
+    own = publish()
+    famous = publish(client_for(other))
+
+    assert not FeedEntry.objects.filter(recipe_id=famous).exists()
+    assert feed(user_client) == [famous, own]
+
+
+def test_demoted_author_keeps_recipes(settings, user_client, author,
+                                      publish, subscribe, unsubscribe):
+    settings.FEED_FANOUT_LIMIT = 1
+    fan = create_user('fan')
+    fan_client = client_for(fan)
+    subscribe(author)
+    subscribe(author, fan_client)
+    famous = publish()
+    assert not FeedEntry.objects.filter(recipe_id=famous).exists()
+
+    unsubscribe(author, fan_client)
+    # Список популярных авторов в кеше истек.
+    cache.delete(CELEBRITIES_KEY)
+
+    assert FeedEntry.objects.filter(user=fan).count() == 0
+    assert feed(user_client) == [famous]
+    assert FeedEntry.objects.filter(recipe_id=famous).count() == 1
@@ -0,0 +1,124 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+
+from recipes.models import (FavoriteRecipe, FeedEntry, Recipe, ShoppingCart,
+                            ShoppingListItem)
+from recipes.pantry import PantryIndex
+from recipes.shopping_list import expected_items
+from users.models import Subscribe, User
+
+pytestmark = pytest.mark.django_db
+
+
+def generate(prefix='user', seed=1, **options):
+    call_command(
+        'generate_data', users=30, recipes=60, prefix=prefix, seed=seed,
+        stdout=StringIO(), **options
+    )
+    return list(User.objects.filter(
+        username__startswith=prefix
+    ).order_by('id').values_list('id', flat=True))
+
+
+def snapshot(user_ids):
+    """Данные генерации без привязки к значениям первичных ключей."""
+    users = {pk: number for number, pk in enumerate(user_ids)}
+    recipes = {
+        pk: number for number, pk in enumerate(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).order_by('id').values_list('id', flat=True))
+    }
+    return {
+        'users': list(User.objects.filter(id__in=user_ids).order_by(
+            'id'
+        ).values_list('first_name', 'last_name')),
+        'recipes': [
+            (users[recipe.author_id], recipe.name, recipe.cooking_time,
+             sorted(recipe.recipe_ingredient.values_list(
+                 'ingredient_id', 'amount'
+             )),
+             sorted(recipe.tags.values_list('id', flat=True)))
+            for recipe in Recipe.objects.filter(id__in=recipes).order_by('id')
+        ],
+        'favorites': sorted(
+            (users[user_id], recipes[recipe_id])
+            for user_id, recipe_id in FavoriteRecipe.objects.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'recipe_id')
+        ),
+        'subscriptions': sorted(
+            (users[user_id], users[author_id])
+            for user_id, author_id in Subscribe.objects.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'author_id')
+        ),
+    }
+
+
+def test_same_seed_same_data():
+    first = snapshot(generate('first'))
+    second = snapshot(generate('second'))
+    other = snapshot(generate('other', seed=2))
+
+    assert first == second
+    assert first != other
+    assert first['favorites'] and first['subscriptions']
+
+
+def test_derived_data_is_filled(anonymous_client):
+    user_ids = generate()
+
+    for user in User.objects.annotate(
+        actual_recipes=Count('recipes', distinct=True),
+        actual_subscribers=Count('sub_author', distinct=True),
+    ):
+        assert user.recipes_count == user.actual_recipes
+        assert user.subscribers_count == user.actual_subscribers
+    for recipe in Recipe.objects.annotate(
+        actual_favorites=Count('favorite_recipe', distinct=True),
+    ):
+        assert recipe.favorites_count == recipe.actual_favorites
+
+    assert ShoppingCart.objects.exists()
+    assert {
+        (item.user_id, item.ingredient_id): item.amount
+        for item in ShoppingListItem.objects.all()
+    } == expected_items(user_ids)
+    subscriptions = set(Subscribe.objects.values_list('user', 'author'))
+    feed = set(FeedEntry.objects.values_list('user', 'author'))
+    assert feed and feed <= subscriptions
+
+    dish = Recipe.objects.order_by('id').first().name.split(':')[0]
+    response = anonymous_client.get('/api/recipes/', {'search': dish})
+    assert response.json()['count'] >= Recipe.objects.filter(
+        name__startswith=f'{dish}:'
+    ).count() > 0
+
+
+def test_pantry_is_rebuilt():
+    index = PantryIndex().actual()
+    generate()
+    recipe = Recipe.objects.order_by('id').first()
+    ingredient_ids = list(recipe.recipe_ingredient.values_list(
+        'ingredient_id', flat=True
+    ))
+
+    found = index.actual().search(ingredient_ids, 100)
+
+    assert (recipe.id, len(ingredient_ids), []) in found
+
+
+def test_existing_prefix():
+    generate()
+
+    with pytest.raises(CommandError):
+        generate()
+
+
+def test_needs_users():
+    with pytest.raises(CommandError):
+        call_command('generate_data', users=0, stdout=StringIO())
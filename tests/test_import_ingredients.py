@@ -0,0 +1,117 @@
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError
+
+from recipes.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+
+def import_data(path, *args):
+    out = StringIO()
+    call_command('import_data_csv', '--path', str(path), *args, stdout=out)
+    return out.getvalue()
+
+
+def catalog():
+    return set(Ingredient.objects.values_list('name', 'measurement_unit'))
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text(
+        'мука,г\nсоль,г\nмука,г\n,г\nсахар\n' + 'x' * 201 + ',г\n',
+        encoding='utf-8'
+    )
+    return path
+
+
+def test_import_is_idempotent(csv_file):
+    output = import_data(csv_file, '--batch-size', '1')
+    assert 'Добавлено: 2, обновлено: 0, пропущено: 1, с ошибками: 3.' in output
+
+    output = import_data(csv_file)
+    assert 'Добавлено: 0' in output
+    assert catalog() == {('мука', 'г'), ('соль', 'г')}
+
+
+def test_json_matches_csv():
+    data = os.path.join(settings.BASE_DIR, 'data')
+
+    import_data(os.path.join(data, 'ingredients.json'))
+    from_json = catalog()
+    output = import_data(os.path.join(data, 'ingredients.csv'))
+
+    assert len(from_json) > 2000
+    assert 'Добавлено: 0' in output
+    assert catalog() == from_json
+
+
+def test_json_is_read_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        'recipes.management.commands.import_data_csv.CHUNK_SIZE', 7
+    )
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps([
+        {'name': 'мука', 'measurement_unit': 'г'},
+        {'name': 'молоко', 'measurement_unit': 'мл'},
+        'мусор',
+    ], ensure_ascii=False), encoding='utf-8')
+
+    output = import_data(path)
+
+    assert 'Добавлено: 2, обновлено: 0, пропущено: 0, с ошибками: 1.' in output
+    assert catalog() == {('мука', 'г'), ('молоко', 'мл')}
+
+
+@pytest.mark.parametrize('content', ['{"name": "мука"}', '[{"name": '])
+def test_broken_json(tmp_path, content):
+    path = tmp_path / 'ingredients.json'
+    path.write_text(content, encoding='utf-8')
+
+    with pytest.raises(CommandError):
+        import_data(path)
+
+
+def test_dry_run(csv_file):
+    Ingredient.objects.create(name='мука', measurement_unit='г')
+
+    output = import_data(csv_file, '--dry-run')
+
+    assert '+ соль (г)' in output
+    assert '+ мука (г)' not in output
+    assert 'Пробный запуск, БД не изменена. Добавлено: 1' in output
+    assert catalog() == {('мука', 'г')}
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(CommandError):
+        import_data(tmp_path / 'ingredients.xml')
+
+
+def test_duplicates_are_rejected():
+    Ingredient.objects.create(name='мука', measurement_unit='г')
+    Ingredient.objects.create(name='мука', measurement_unit='кг')
+
+    with pytest.raises(IntegrityError):
+        Ingredient.objects.create(name='мука', measurement_unit='г')
+
+
+def test_autocomplete_sees_import(anonymous_client, csv_file, commit):
+    assert anonymous_client.get('/api/ingredients/').json() == []
+
+    with commit():
+        import_data(csv_file)
+
+    assert [
+        item['name'] for item in anonymous_client.get(
+            '/api/ingredients/', {'name': 'с'}
+        ).json()
+    ] == ['соль']
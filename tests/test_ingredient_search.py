@@ -0,0 +1,121 @@
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.search import FUZZY_LIMIT, ingredient_index
+from recipes.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalog(ingredients):
+    Ingredient.objects.bulk_create([
+        Ingredient(name=name, measurement_unit='г')
+        for name in ('Мускатный орех', 'молоко сгущенное', 'ёжевика')
+    ])
+
+
+def names(response):
+    assert response.status_code == 200, response.content
+    return [item['name'] for item in response.json()]
+
+
+def test_prefix(anonymous_client, catalog):
+    assert names(anonymous_client.get(
+        '/api/ingredients/', {'name': 'МУ'}
+    )) == ['мука', 'Мускатный орех']
+    assert names(anonymous_client.get(
+        '/api/ingredients/', {'name': 'моло'}
+    )) == ['молоко', 'молоко сгущенное']
+    assert names(anonymous_client.get(
+        '/api/ingredients/', {'name': 'еж'}
+    )) == ['ёжевика']
+    assert names(anonymous_client.get(
+        '/api/ingredients/', {'name': 'сгущ'}
+    )) == []
+    assert len(names(anonymous_client.get('/api/ingredients/'))) == 7
+
+
+def test_answered_from_memory(anonymous_client, catalog):
+    anonymous_client.get('/api/ingredients/', {'name': 'м'})
+
+    with CaptureQueriesContext(connection) as queries:
+        found = names(anonymous_client.get('/api/ingredients/', {'name': 'м'}))
+
+    assert len(found) == 4
+    assert len(queries) == 0
+
+
+def test_rebuilt_after_change(anonymous_client, catalog, commit):
+    anonymous_client.get('/api/ingredients/', {'name': 'м'})
+
+    with commit():
+        ingredient = Ingredient.objects.get(name='мука')
+        ingredient.name = 'рисовая мука'
+        ingredient.save()
+
+    assert names(anonymous_client.get(
+        '/api/ingredients/', {'name': 'м'}
+    )) == ['молоко', 'молоко сгущенное', 'Мускатный орех']
+
+
+def test_etag(anonymous_client, catalog, commit):
+    etag = anonymous_client.get(
+        '/api/ingredients/', {'name': 'м'}
+    )['ETag']
+
+    response = anonymous_client.get(
+        '/api/ingredients/', {'name': 'м'}, HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == 304
+    assert anonymous_client.get(
+        '/api/ingredients/', {'name': 'мо'}
+    )['ETag'] != etag
+
+    with commit():
+        Ingredient.objects.create(name='мак', measurement_unit='г')
+
+    response = anonymous_client.get(
+        '/api/ingredients/', {'name': 'м'}, HTTP_IF_NONE_MATCH=etag
+    )
+    assert response.status_code == 200
+    assert 'мак' in names(response)
+
+
+@pytest.fixture
+def full_catalog():
+    call_command('import_data_csv', stdout=StringIO())
+
+
+def fuzzy(client, name):
+    return names(client.get('/api/ingredients/', {'name': name, 'fuzzy': 1}))
+
+
+def test_fuzzy_finds_typos(anonymous_client, full_catalog):
+    assert fuzzy(anonymous_client, 'малако')[0] == 'молоко'
+    assert 'помидоры' in fuzzy(anonymous_client, 'памидор')
+    assert fuzzy(anonymous_client, 'ккк') == []
+
+
+def test_fuzzy_prefix_first(anonymous_client, full_catalog):
+    found = fuzzy(anonymous_client, 'молоко')
+
+    assert len(found) == FUZZY_LIMIT
+    prefix = names(anonymous_client.get(
+        '/api/ingredients/', {'name': 'молоко'}
+    ))
+    assert found[:len(prefix)] == prefix
+
+
+def test_fuzzy_is_fast(anonymous_client, full_catalog):
+    ingredient_index.actual()
+    started = time.perf_counter()
+    for query in ('малако', 'памидор', 'гречка', 'сыр тверд'):
+        ingredient_index.fuzzy(query)
+
+    assert (time.perf_counter() - started) / 4 < 0.05
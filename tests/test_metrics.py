@@ -0,0 +1,82 @@
+import pytest
+from prometheus_client import REGISTRY
+
+pytestmark = pytest.mark.django_db
+
+OUTSIDE = '10.0.0.5'
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_is_counted_by_route(anonymous_client):
+    labels = {'view': 'recipes-list', 'method': 'GET'}
+    requests = sample('foodgram_requests_total', status='200', **labels)
+    latency = sample('foodgram_request_duration_seconds_count', **labels)
+
+    response = anonymous_client.get('/api/recipes/')
+
+    assert response.status_code == 200, response.content
+    assert sample(
+        'foodgram_requests_total', status='200', **labels
+    ) == requests + 1
+    assert sample(
+        'foodgram_request_duration_seconds_count', **labels
+    ) == latency + 1
+    assert sample('foodgram_requests_in_flight') == 0
+
+
+def test_unknown_url_has_one_label(anonymous_client):
+    before = sample(
+        'foodgram_requests_total',
+        view='<unmatched>', method='GET', status='404'
+    )
+
+    anonymous_client.get('/api/no-such-url/1/')
+    anonymous_client.get('/api/no-such-url/2/')
+
+    assert sample(
+        'foodgram_requests_total',
+        view='<unmatched>', method='GET', status='404'
+    ) == before + 2
+
+
+def test_metrics_from_allowed_address(anonymous_client):
+    anonymous_client.get('/api/recipes/')
+
+    response = anonymous_client.get('/metrics')
+
+    assert response.status_code == 200
+    assert b'foodgram_requests_total{' in response.content
+
+
+def test_metrics_from_other_address(anonymous_client):
+    response = anonymous_client.get('/metrics', REMOTE_ADDR=OUTSIDE)
+
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize('header, status', [
+    ('Bearer secret', 200),
+    ('Bearer wrong', 403),
+    ('', 403),
+])
+def test_metrics_token(settings, anonymous_client, header, status):
+    settings.METRICS_TOKEN = 'secret'
+
+    response = anonymous_client.get(
+        '/metrics', REMOTE_ADDR=OUTSIDE, HTTP_AUTHORIZATION=header
+    )
+
+    assert response.status_code == status
+
+
+def test_empty_token_is_not_accepted(settings, anonymous_client):
+    settings.METRICS_TOKEN = ''
+
+    response = anonymous_client.get(
+        '/metrics', REMOTE_ADDR=OUTSIDE, HTTP_AUTHORIZATION='Bearer '
+    )
+
+    assert response.status_code == 403
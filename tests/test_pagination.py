@@ -0,0 +1,96 @@
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from recipes.models import FavoriteRecipe, Recipe
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(author_client, tags, ingredients):
+    recipe_ids = [
+        create_recipe(author_client, tags[number % 2:][:1],
+                      [(ingredients[0], 1)], name=f'Рецепт {number}')
+        for number in range(7)
+    ]
+    # У части рецептов одинаковая дата: порядок между ними задает id.
+    Recipe.objects.filter(id__in=recipe_ids[2:5]).update(
+        pub_date=timezone.now()
+    )
+    cache.clear()
+    return sorted(
+        recipe_ids,
+        key=lambda pk: (Recipe.objects.get(id=pk).pub_date, pk),
+        reverse=True
+    )
+
+
+def pages(client, **params):
+    response = client.get('/api/recipes/', {'cursor': '', **params})
+    while True:
+        assert response.status_code == 200, response.content
+        data = response.json()
+        yield data
+        if not data['next']:
+            return
+        response = client.get(data['next'])
+
+
+def recipe_ids(pages):
+    return [item['id'] for page in pages for item in page['results']]
+
+
+def test_cursor_walks_all_recipes(anonymous_client, recipes):
+    result = list(pages(anonymous_client, limit=2))
+
+    assert len(result) == 4
+    assert recipe_ids(result) == recipes
+    assert {page['count'] for page in result} == {7}
+
+
+def test_new_recipe_does_not_shift_pages(anonymous_client, author_client,
+                                         recipes, tags, ingredients):
+    result = pages(anonymous_client, limit=3)
+    first = next(result)
+    create_recipe(author_client, tags[:1], [(ingredients[0], 1)])
+
+    assert recipe_ids([first, *result]) == recipes
+
+
+def test_count_can_be_skipped(anonymous_client, recipes):
+    page = next(pages(anonymous_client, limit=2, count='false'))
+
+    assert 'count' not in page
+    assert page['next']
+
+
+def test_works_with_filters(anonymous_client, user_client, user, recipes,
+                            tags):
+    FavoriteRecipe.objects.create(user=user, recipe_id=recipes[0])
+    FavoriteRecipe.objects.create(user=user, recipe_id=recipes[-1])
+    dinner = Recipe.objects.filter(tags=tags[0]).order_by('-pub_date', '-id')
+
+    assert recipe_ids(
+        pages(anonymous_client, limit=2, tags=tags[0].slug)
+    ) == list(dinner.values_list('id', flat=True))
+    assert recipe_ids(
+        pages(user_client, limit=1, is_favorited=1)
+    ) == [recipes[0], recipes[-1]]
+
+
+@pytest.mark.parametrize('cursor', ['x', 'eA==', 'MjAyMS0wMS0wMXx4'])
+def test_invalid_cursor(anonymous_client, recipes, cursor):
+    response = anonymous_client.get('/api/recipes/', {'cursor': cursor})
+
+    assert response.status_code == 404
+
+
+def test_page_numbers_by_default(anonymous_client, recipes):
+    data = anonymous_client.get('/api/recipes/', {'page': 2}).json()
+
+    assert data['count'] == 7
+    assert data['previous']
+    assert [item['id'] for item in data['results']] == recipes[6:]
@@ -0,0 +1,95 @@
+import pytest
+
+from recipes.models import Ingredient, IngredientRecipe
+from recipes.pantry import PantryIndex, record_change, reset_pantry
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(author_client, tags, ingredients, commit):
+    eggs, flour, milk, salt = ingredients
+    with commit():
+        return {
+            name: create_recipe(
+                author_client, tags[:1],
+                [(ingredient, 1) for ingredient in items], name=name
+            )
+            for name, items in (
+                ('Яичница', [eggs, salt]),
+                ('Блины', [eggs, flour, milk, salt]),
+                ('Каша', [milk, flour]),
+            )
+        }
+
+
+@pytest.fixture(autouse=True)
+def new_epoch():
+    # Индекс воркера общий для тестов: новая эпоха заставляет
+    # перестроить его по данным теста.
+    reset_pantry()
+
+
+def search(client, ingredients):
+    response = client.post('/api/recipes/pantry/', {
+        'ingredients': [ingredient.id for ingredient in ingredients]
+    }, format='json')
+    assert response.status_code == 200, response.content
+    return [
+        (item['name'], item['matched_count'],
+         [missing['name'] for missing in item['missing_ingredients']])
+        for item in response.json()
+    ]
+
+
+def test_ranked_by_coverage(user_client, recipes, ingredients):
+    eggs, flour, milk, salt = ingredients
+
+    assert search(user_client, [eggs, salt, milk]) == [
+        ('Яичница', 2, []),
+        ('Блины', 3, ['мука']),
+        ('Каша', 1, ['мука']),
+    ]
+
+
+def test_deleted_ingredient_is_skipped(user_client, recipes,
+                                       ingredients):
+    eggs, flour, milk, salt = ingredients
+    search(user_client, [eggs])
+    # Индекс еще не получил изменение из журнала.
+    Ingredient.objects.filter(id=milk.id).delete()
+
+    assert search(user_client, [eggs, salt]) == [
+        ('Яичница', 2, []), ('Блины', 2, ['мука']),
+    ]
+
+
+def test_change_log_matches_rebuild(recipes, ingredients, commit):
+    eggs, flour, milk, salt = ingredients
+    index = PantryIndex().actual()
+    with commit():
+        IngredientRecipe.objects.filter(
+            recipe_id=recipes['Каша'], ingredient=flour
+        ).delete()
+        IngredientRecipe.objects.create(
+            recipe_id=recipes['Яичница'], ingredient=milk, amount=1
+        )
+
+    assert index.actual() is index
+    assert index.snapshot == PantryIndex().actual().snapshot
+    assert index.search([milk.id], 3)[0] == (recipes['Каша'], 1, [])
+
+
+def test_new_epoch_rebuilds(recipes, ingredients):
+    index = PantryIndex().actual()
+    IngredientRecipe.objects.filter(recipe_id=recipes['Каша']).delete()
+    record_change(recipes['Каша'])
+    epoch = index.epoch
+
+    reset_pantry()
+    index.actual()
+
+    assert index.epoch != epoch
+    assert recipes['Каша'] not in index.snapshot.required
@@ -0,0 +1,126 @@
+import pytest
+from django.db import transaction
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe(author_client, tags, ingredients, commit):
+    with commit():
+        return create_recipe(
+            author_client, tags[:1],
+            [(ingredients[0], 10), (ingredients[1], 20)]
+        )
+
+
+def detail(client, recipe_id):
+    response = client.get(f'/api/recipes/{recipe_id}/')
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def listed(client, recipe_id):
+    response = client.get('/api/recipes/')
+    assert response.status_code == 200, response.content
+    return next(
+        item for item in response.json()['results']
+        if item['id'] == recipe_id
+    )
+
+
+@pytest.fixture(params=[detail, listed], ids=['detail', 'list'])
+def read(request, anonymous_client, recipe):
+    """Читает рецепт и заполняет кеш перед изменением."""
+    request.param(anonymous_client, recipe)
+    return lambda: request.param(anonymous_client, recipe)
+
+
+def amounts(data):
+    return {item['name']: item['amount'] for item in data['ingredients']}
+
+
+def test_cached_response_is_reused(read, recipe, commit):
+    with commit():
+        Recipe.objects.filter(id=recipe).update(name='Без сигналов')
+
+    assert read()['name'] == 'Рецепт'
+
+
+def test_recipe_update(read, author_client, recipe, commit):
+    with commit():
+        response = author_client.patch(
+            f'/api/recipes/{recipe}/', {'name': 'Новое имя'}, format='json'
+        )
+    assert response.status_code == 200, response.content
+
+    assert read()['name'] == 'Новое имя'
+
+
+def test_ingredient_rows_from_shell(read, recipe, commit):
+    with commit():
+        for row in IngredientRecipe.objects.filter(recipe_id=recipe):
+            row.amount += 1
+            row.save()
+
+    assert amounts(read()) == {'яйца': 11, 'мука': 21}
+
+
+def test_ingredient_row_delete(read, recipe, ingredients, commit):
+    with commit():
+        IngredientRecipe.objects.get(
+            recipe_id=recipe, ingredient=ingredients[1]
+        ).delete()
+
+    assert amounts(read()) == {'яйца': 10}
+
+
+def test_recipe_tags_change(read, recipe, tags, commit):
+    with commit():
+        Recipe.objects.get(id=recipe).tags.add(tags[1])
+
+    assert len(read()['tags']) == 2
+
+    with commit():
+        tags[1].recipes.remove(recipe)
+
+    assert len(read()['tags']) == 1
+
+
+def test_tag_rename(read, tags, commit):
+    with commit():
+        tag = Tag.objects.get(id=tags[0].id)
+        tag.name = 'Праздник'
+        tag.save()
+
+    assert read()['tags'][0]['name'] == 'Праздник'
+
+
+def test_ingredient_rename(read, ingredients, commit):
+    with commit():
+        ingredient = Ingredient.objects.get(id=ingredients[0].id)
+        ingredient.name = 'перепелиные яйца'
+        ingredient.save()
+
+    assert 'перепелиные яйца' in amounts(read())
+
+
+def test_changes_after_rollback(read, recipe, ingredients, commit):
+    with commit():
+        # Откат savepoint снимает его обработчики on_commit: изменения
+        # после него собираются заново.
+        with pytest.raises(ValueError), transaction.atomic():
+            IngredientRecipe.objects.get(
+                recipe_id=recipe, ingredient=ingredients[0]
+            ).delete()
+            raise ValueError
+        row = IngredientRecipe.objects.get(
+            recipe_id=recipe, ingredient=ingredients[1]
+        )
+        row.amount = 50
+        row.save()
+
+    assert amounts(read()) == {'яйца': 10, 'мука': 50}
@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import IngredientRecipe, Recipe
+
+from .conftest import IMAGE, create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+def post(client, tags, ingredients):
+    return client.post('/api/recipes/', {
+        'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+        'image': IMAGE, 'tags': tags,
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 1}
+            for ingredient_id in ingredients
+        ],
+    }, format='json')
+
+
+def test_queries_do_not_grow_with_ingredients(author_client, tags,
+                                              ingredients):
+    def queries(count):
+        with CaptureQueriesContext(connection) as queries:
+            create_recipe(
+                author_client, tags[:count],
+                [(ingredient, 1) for ingredient in ingredients[:count]]
+            )
+        return len(queries)
+
+    # Первый запрос еще и кладет токен в кеш.
+    queries(1)
+    assert queries(1) == queries(3)
+
+
+@pytest.mark.parametrize('tag_ids, ingredient_ids, field', [
+    ([0], [0, 0], 'ingredients'),
+    ([0], [0, 99], 'ingredients'),
+    ([0], [], 'ingredients'),
+    ([0, 0], [0], 'tags'),
+    ([99], [0], 'tags'),
+    ([], [0], 'tags'),
+])
+def test_invalid_recipe(author_client, tags, ingredients, tag_ids,
+                        ingredient_ids, field):
+    response = post(
+        author_client,
+        [tags[i].id if i < len(tags) else 999 for i in tag_ids],
+        [
+            ingredients[i].id if i < len(ingredients) else 999
+            for i in ingredient_ids
+        ],
+    )
+
+    assert response.status_code == 400
+    assert list(response.json()) == [field]
+    assert not Recipe.objects.exists()
+
+
+def test_failed_insert_rolls_back(author_client, tags, ingredients,
+                                  monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError
+
+    monkeypatch.setattr(IngredientRecipe.objects, 'bulk_create', fail)
+
+    with pytest.raises(RuntimeError):
+        post(author_client, [tags[0].id], [ingredients[0].id])
+    assert not Recipe.objects.exists()
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.serializers import RecipeRetriveSerializer
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscribe
+
+from .conftest import client_for, create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def fast_readers(settings):
+    settings.FAST_READ_SERIALIZERS = True
+
+
+@pytest.fixture
+def recipes(author_client, tags, ingredients):
+    return [
+        create_recipe(
+            author_client, tags[number:], [
+                (ingredient, 100 * number + position + 1)
+                for position, ingredient in enumerate(
+                    reversed(ingredients[number:])
+                )
+            ],
+            name=f'Рецепт {number}', cooking_time=10 + number,
+        )
+        for number in range(3)
+    ]
+
+
+@pytest.fixture(params=['anonymous', 'authenticated'])
+def reader(request, user, author, recipes):
+    """Клиент и пользователь; у авторизованного есть подписка на
+    автора, избранное и корзина."""
+    if request.param == 'anonymous':
+        return APIClient(), AnonymousUser()
+    Subscribe.objects.create(user=user, author=author)
+    FavoriteRecipe.objects.create(user=user, recipe_id=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe_id=recipes[1])
+    return client_for(user), user
+
+
+def serialized(recipe_ids, user):
+    """Представления, которые отдавал RecipeRetriveSerializer до
+    сборки фрагментов из строк; флаги он считает сам."""
+    request = RequestFactory().get('/api/recipes/')
+    request.user = user
+    data = RecipeRetriveSerializer(
+        Recipe.objects.with_related().filter(id__in=recipe_ids),
+        many=True, context={'request': request}
+    ).data
+    renderer = JSONRenderer()
+    return {item['id']: json.loads(renderer.render(item)) for item in data}
+
+
+def test_list_matches_serializer(reader, recipes):
+    client, user = reader
+    expected = serialized(recipes, user)
+    assert any(
+        item['is_favorited'] for item in expected.values()
+    ) == user.is_authenticated
+
+    # Второй запрос берет фрагменты из кеша.
+    for _ in range(2):
+        response = client.get('/api/recipes/')
+        assert response.status_code == 200, response.content
+        assert {
+            item['id']: item for item in response.json()['results']
+        } == expected
+
+
+def test_detail_matches_serializer(reader, recipes):
+    client, user = reader
+    expected = serialized(recipes, user)
+
+    for recipe_id in recipes:
+        for _ in range(2):
+            response = client.get(f'/api/recipes/{recipe_id}/')
+            assert response.status_code == 200, response.content
+            assert response.json() == expected[recipe_id]
+
+
+def test_shared_fragments_with_own_flags(user_client, author_client, user,
+                                         author, recipes):
+    """Второй читатель получает те же фрагменты со своими флагами,
+    без повторной выборки тегов, ингредиентов и автора."""
+    Subscribe.objects.create(user=user, author=author)
+    FavoriteRecipe.objects.create(user=user, recipe_id=recipes[0])
+    author_client.get('/api/recipes/')
+
+    with CaptureQueriesContext(connection) as queries:
+        data = user_client.get('/api/recipes/').json()['results']
+    assert not any(
+        'recipes_ingredientrecipe' in query['sql'] for query in queries
+    )
+    assert {item['id']: item['is_favorited'] for item in data} == {
+        recipes[0]: True, recipes[1]: False, recipes[2]: False
+    }
+    assert {item['author']['is_subscribed'] for item in data} == {True}
+
+    data = author_client.get('/api/recipes/').json()['results']
+    assert not any(item['is_favorited'] for item in data)
+    assert {item['author']['is_subscribed'] for item in data} == {False}
+
+
+def test_flag_queries_do_not_grow_with_page(user_client, user,
+                                            author_client, recipes, tags,
+                                            ingredients):
+    def warm_queries():
+        user_client.get('/api/recipes/')
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get('/api/recipes/')
+        assert response.status_code == 200
+        return len(queries)
+
+    few = warm_queries()
+    for recipe_id in recipes:
+        FavoriteRecipe.objects.create(user=user, recipe_id=recipe_id)
+    for _ in range(3):
+        create_recipe(author_client, tags[:1], [(ingredients[0], 1)])
+
+    assert warm_queries() == few
@@ -0,0 +1,91 @@
+import pytest
+
+from recipes.models import IngredientRecipe, Recipe
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe(author_client, tags, ingredients, commit):
+    with commit():
+        return create_recipe(
+            author_client, tags[:2],
+            [(ingredients[0], 1), (ingredients[1], 2), (ingredients[2], 3)]
+        )
+
+
+def rows(recipe_id):
+    return {
+        row.ingredient_id: (row.id, row.amount)
+        for row in IngredientRecipe.objects.filter(recipe_id=recipe_id)
+    }
+
+
+def tag_ids(recipe_id):
+    return set(
+        Recipe.objects.get(id=recipe_id).tags.values_list('id', flat=True)
+    )
+
+
+def patch(client, recipe_id, commit, **data):
+    with commit():
+        response = client.patch(
+            f'/api/recipes/{recipe_id}/', data, format='json'
+        )
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def test_only_changed_rows_are_touched(author_client, recipe, ingredients,
+                                       commit):
+    eggs, flour, milk, salt = ingredients
+    before = rows(recipe)
+
+    patch(author_client, recipe, commit, ingredients=[
+        {'id': eggs.id, 'amount': 1},
+        {'id': flour.id, 'amount': 5},
+        {'id': salt.id, 'amount': 4},
+    ])
+
+    after = rows(recipe)
+    assert after[eggs.id] == before[eggs.id]
+    assert after[flour.id] == (before[flour.id][0], 5)
+    assert milk.id not in after
+    assert after[salt.id][1] == 4
+
+
+def test_tags_diff(author_client, recipe, tags, commit):
+    patch(author_client, recipe, commit, tags=[tags[1].id, tags[2].id])
+
+    assert tag_ids(recipe) == {tags[1].id, tags[2].id}
+
+
+def test_patch_without_relations(author_client, recipe, tags, commit):
+    before = rows(recipe)
+
+    patch(author_client, recipe, commit, name='Новое имя')
+
+    assert rows(recipe) == before
+    assert tag_ids(recipe) == {tags[0].id, tags[1].id}
+
+
+def test_ingredient_patch_updates_cached_recipe(anonymous_client,
+                                                author_client, recipe,
+                                                ingredients, commit):
+    anonymous_client.get(f'/api/recipes/{recipe}/')
+    anonymous_client.get('/api/recipes/')
+
+    patch(author_client, recipe, commit, ingredients=[
+        {'id': ingredients[3].id, 'amount': 7},
+    ])
+
+    expected = [{
+        'id': ingredients[3].id, 'name': 'соль',
+        'measurement_unit': 'г', 'amount': 7,
+    }]
+    detail = anonymous_client.get(f'/api/recipes/{recipe}/').json()
+    assert detail['ingredients'] == expected
+    listed = anonymous_client.get('/api/recipes/').json()['results']
+    assert listed[0]['ingredients'] == expected
@@ -0,0 +1,90 @@
+import pytest
+
+from api.replicas import use_replica
+from recipes.models import Tag
+from users.models import Subscribe
+
+from .conftest import create_user
+
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'])
+
+
+@pytest.fixture(autouse=True)
+def replica(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+
+
+@pytest.fixture
+def profile():
+    """Пользователь с одним id и разными именами в primary и реплике:
+    по имени в ответе видно, откуда он прочитан."""
+    user = create_user('primary')
+    create_user('replica', using='replica', pk=user.pk)
+    return f'/api/users/{user.pk}/'
+
+
+def username(response):
+    assert response.status_code == 200, response.content
+    return response.json()['username']
+
+
+def test_safe_request_reads_from_replica(anonymous_client, profile):
+    assert username(anonymous_client.get(profile)) == 'replica'
+
+
+def test_primary_without_replicas(settings, anonymous_client, profile):
+    settings.DATABASE_REPLICAS = []
+
+    assert username(anonymous_client.get(profile)) == 'primary'
+
+
+def test_write_goes_to_default(user_client, user, author):
+    response = user_client.post(f'/api/users/{author.id}/subscribe/')
+
+    assert response.status_code == 201, response.content
+    assert Subscribe.objects.using('default').filter(
+        user=user, author=author
+    ).exists()
+    assert not Subscribe.objects.using('replica').exists()
+
+
+def test_object_read_from_replica_is_saved_to_default():
+    Tag.objects.using('replica').create(
+        name='Реплика', color='#000000', slug='replica'
+    )
+    token = use_replica.set(True)
+    try:
+        tag = Tag.objects.get(slug='replica')
+        tag.name = 'Изменен'
+        tag.save()
+    finally:
+        use_replica.reset(token)
+
+    assert tag._state.db == 'default'
+    assert Tag.objects.using('default').get(slug='replica').name == 'Изменен'
+    assert Tag.objects.using('replica').get(slug='replica').name == 'Реплика'
+
+
+def test_read_after_write_goes_to_primary(user_client, author, profile):
+    assert username(user_client.get(profile)) == 'replica'
+
+    response = user_client.post(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 201, response.content
+
+    assert username(user_client.get(profile)) == 'primary'
+
+
+def test_shared_change_pins_everyone(
+    anonymous_client, profile, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Новый', color='#FFFFFF', slug='new')
+
+    assert username(anonymous_client.get(profile)) == 'primary'
+
+
+def test_pin_is_per_client(user_client, author, anonymous_client, profile):
+    response = user_client.post(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 201, response.content
+
+    assert username(anonymous_client.get(profile)) == 'replica'
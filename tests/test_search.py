@@ -0,0 +1,79 @@
+import pytest
+
+from recipes.models import Ingredient
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(author_client, tags, ingredients, commit):
+    """Слово «молоко» в названии, в ингредиентах и в описании."""
+    with commit():
+        return {
+            name: create_recipe(
+                author_client, tags[:1], [(ingredient, 10)],
+                name=name, text=text,
+            )
+            for name, text, ingredient in (
+                ('Омлет', 'Взбить яйца с молоком', ingredients[0]),
+                ('Блины', 'Замесить тесто', ingredients[2]),
+                ('Каша на молоке', 'Сварить', ingredients[1]),
+            )
+        }
+
+
+def found(client, query, **params):
+    response = client.get('/api/recipes/', {'search': query, **params})
+    assert response.status_code == 200, response.content
+    return [item['name'] for item in response.json()['results']]
+
+
+def test_ranked_by_field(anonymous_client, recipes):
+    assert found(anonymous_client, 'молоко') == [
+        'Каша на молоке', 'Блины', 'Омлет'
+    ]
+
+
+def test_all_words_required(anonymous_client, recipes):
+    assert found(anonymous_client, 'молоко тесто') == ['Блины']
+    assert found(anonymous_client, 'молоко шоколад') == []
+
+
+def test_index_follows_recipe_changes(
+    anonymous_client, author_client, recipes, commit
+):
+    with commit():
+        response = author_client.patch(
+            f'/api/recipes/{recipes["Омлет"]}/',
+            {'text': 'Взбить яйца'}, format='json'
+        )
+    assert response.status_code == 200, response.content
+
+    assert found(anonymous_client, 'молоко') == ['Каша на молоке', 'Блины']
+
+
+def test_index_follows_ingredient_rename(anonymous_client, recipes, commit):
+    with commit():
+        ingredient = Ingredient.objects.get(name='соль')
+        ingredient.name = 'морская соль'
+        ingredient.save()
+        ingredient = Ingredient.objects.get(name='мука')
+        ingredient.name = 'рисовая мука'
+        ingredient.save()
+
+    assert found(anonymous_client, 'рисовая') == ['Каша на молоке']
+
+
+def test_cursor_keeps_rank_order(anonymous_client, recipes):
+    response = anonymous_client.get(
+        '/api/recipes/', {'search': 'молоко', 'cursor': '', 'limit': 2}
+    )
+
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data['count'] == 3
+    assert [item['name'] for item in data['results']] == [
+        'Каша на молоке', 'Блины', 'Омлет'
+    ]
@@ -0,0 +1,123 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models.signals import pre_delete
+
+from recipes.models import Recipe, ShoppingCart, ShoppingListItem
+from recipes.shopping_list import add_recipe, expected_items
+
+from .conftest import create_recipe, create_user
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(author_client, tags, ingredients):
+    eggs, flour, milk, _ = ingredients
+    return [
+        create_recipe(author_client, tags[:1], [(eggs, 2), (flour, 100)]),
+        create_recipe(author_client, tags[:1], [(eggs, 3), (milk, 200)]),
+    ]
+
+
+@pytest.fixture
+def buyers(user, author):
+    return [user, author, create_user('buyer')]
+
+
+def items():
+    return {
+        (item.user_id, item.ingredient_id): item.amount
+        for item in ShoppingListItem.objects.all()
+    }
+
+
+def assert_matches_recount(buyers):
+    assert items() == expected_items([buyer.id for buyer in buyers])
+
+
+def test_cart_changes(user_client, buyers, recipes):
+    for recipe in recipes:
+        user_client.post(f'/api/recipes/{recipe}/shopping_cart/')
+    assert len(items()) == 3
+    assert_matches_recount(buyers)
+
+    user_client.delete(f'/api/recipes/{recipes[0]}/shopping_cart/')
+    assert_matches_recount(buyers)
+
+
+def test_recipe_edit(author_client, buyers, recipes, ingredients):
+    for buyer in buyers:
+        ShoppingCart.objects.create(user=buyer, recipe_id=recipes[0])
+
+    response = author_client.patch(f'/api/recipes/{recipes[0]}/', {
+        'ingredients': [
+            {'id': ingredients[0].id, 'amount': 5},
+            {'id': ingredients[3].id, 'amount': 1},
+        ],
+    }, format='json')
+
+    assert response.status_code == 200, response.content
+    assert_matches_recount(buyers)
+
+
+def test_recipe_and_cart_deletes(buyers, recipes):
+    for buyer in buyers:
+        for recipe in recipes:
+            ShoppingCart.objects.create(user=buyer, recipe_id=recipe)
+
+    Recipe.objects.get(id=recipes[0]).delete()
+    assert_matches_recount(buyers)
+
+    ShoppingCart.objects.filter(user=buyers[0]).delete()
+    assert_matches_recount(buyers)
+
+    buyers[1].delete()
+    assert_matches_recount(buyers)
+
+
+def test_existing_row_is_added_to(user, recipes, ingredients):
+    # Позиция уже есть, например ее вставила параллельная транзакция:
+    # количество прибавляется к ней.
+    ShoppingListItem.objects.create(
+        user=user, ingredient=ingredients[0], amount=1
+    )
+    ShoppingCart.objects.bulk_create([
+        ShoppingCart(user=user, recipe_id=recipes[0])
+    ])
+
+    add_recipe(user.id, recipes[0])
+
+    assert items() == {
+        (user.id, ingredients[0].id): 3, (user.id, ingredients[1].id): 100
+    }
+
+
+def test_failed_delete_does_not_leak(user, user_client, recipes):
+    ShoppingCart.objects.create(user=user, recipe_id=recipes[0])
+
+    def fail(sender, **kwargs):
+        raise ValueError
+
+    pre_delete.connect(fail, sender=Recipe)
+    try:
+        with pytest.raises(ValueError), transaction.atomic():
+            Recipe.objects.get(id=recipes[0]).delete()
+    finally:
+        pre_delete.disconnect(fail, sender=Recipe)
+    assert_matches_recount([user])
+
+    user_client.delete(f'/api/recipes/{recipes[0]}/shopping_cart/')
+
+    assert items() == {}
+
+
+def test_check_shopping_lists_fixes_drift(user, recipes):
+    ShoppingCart.objects.create(user=user, recipe_id=recipes[0])
+    ShoppingListItem.objects.filter(user=user).update(amount=999)
+
+    call_command('check_shopping_lists', stdout=StringIO())
+
+    assert_matches_recount([user])
@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+
+from .conftest import create_recipe
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.fixture
+def cart(user_client, author_client, tags, ingredients):
+    eggs, flour, milk, _ = ingredients
+    for pairs in ([(eggs, 2), (flour, 100)], [(eggs, 3), (milk, 200)]):
+        recipe = create_recipe(author_client, tags[:1], pairs)
+        user_client.post(f'/api/recipes/{recipe}/shopping_cart/')
+
+
+def download(client, filetype, **headers):
+    response = client.get(URL, {'filetype': filetype}, **headers)
+    assert response.status_code == 200
+    assert response.streaming
+    return response, b''.join(response.streaming_content)
+
+
+def test_txt(user_client, cart):
+    response, content = download(user_client, 'txt')
+
+    assert response['Content-Type'] == 'text/plain; charset=utf-8'
+    assert content.decode() == (
+        f'{date.today()}\nСписок покупок:\n'
+        '\nмолоко (мл) - 200\nмука (г) - 100\nяйца (шт) - 5'
+    )
+
+
+def test_csv(user_client, cart):
+    response, content = download(user_client, 'csv')
+
+    assert 'shopping_list.csv' in response['Content-Disposition']
+    assert list(csv.reader(io.StringIO(content.decode()))) == [
+        ['Ингредиент', 'Единица измерения', 'Количество'],
+        ['молоко', 'мл', '200'], ['мука', 'г', '100'], ['яйца', 'шт', '5'],
+    ]
+
+
+def test_json(user_client, cart):
+    _, content = download(user_client, 'json')
+
+    assert json.loads(content) == {
+        'date': str(date.today()),
+        'ingredients': [
+            {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 200},
+            {'name': 'мука', 'measurement_unit': 'г', 'amount': 100},
+            {'name': 'яйца', 'measurement_unit': 'шт', 'amount': 5},
+        ],
+    }
+
+
+def test_pdf(user_client, cart):
+    response, content = download(user_client, 'pdf')
+
+    assert response['Content-Type'] == 'application/pdf'
+    assert content.startswith(b'%PDF')
+
+
+def test_empty_cart(user_client):
+    _, content = download(user_client, 'json')
+
+    assert json.loads(content)['ingredients'] == []
+
+
+def test_unknown_format(user_client, cart):
+    assert user_client.get(URL, {'filetype': 'xls'}).status_code == 400
+
+
+def test_etag(user_client, cart, author_client, tags, ingredients,
+              commit):
+    response, _ = download(user_client, 'txt')
+    etag = response['ETag']
+
+    response = user_client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert download(user_client, 'csv')[0]['ETag'] != etag
+
+    recipe = create_recipe(author_client, tags[:1], [(ingredients[3], 1)])
+    with commit():
+        user_client.post(f'/api/recipes/{recipe}/shopping_cart/')
+
+    response, content = download(user_client, 'txt', HTTP_IF_NONE_MATCH=etag)
+    assert response['ETag'] != etag
+    assert 'соль (г) - 1' in content.decode()
@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Subscribe
+
+from .conftest import client_for, create_recipe, create_user
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/users/subscriptions/'
+
+
+@pytest.fixture
+def authors(user, tags, ingredients, commit):
+    """Авторы с одним, двумя и тремя рецептами."""
+    authors = []
+    for number in range(1, 4):
+        author = create_user(f'author{number}')
+        client = client_for(author)
+        with commit():
+            for _ in range(number):
+                create_recipe(client, tags[:1], [(ingredients[0], 1)])
+        Subscribe.objects.create(user=user, author=author)
+        authors.append(author)
+    return authors
+
+
+def test_latest_recipes_per_author(user_client, authors):
+    response = user_client.get(URL, {'recipes_limit': 2})
+
+    assert response.status_code == 200, response.content
+    results = response.json()['results']
+    assert [item['username'] for item in results] == [
+        'author1', 'author2', 'author3'
+    ]
+    assert [item['recipes_count'] for item in results] == [1, 2, 3]
+    assert [len(item['recipes']) for item in results] == [1, 2, 2]
+    assert {item['is_subscribed'] for item in results} == {True}
+    latest = authors[2].recipes.order_by('-pub_date', '-id')[:2]
+    assert [recipe['id'] for recipe in results[2]['recipes']] == [
+        recipe.id for recipe in latest
+    ]
+
+
+def test_without_limit(user_client, authors):
+    results = user_client.get(URL).json()['results']
+
+    assert [len(item['recipes']) for item in results] == [1, 2, 3]
+
+
+def test_queries_do_not_grow_with_authors(user_client, authors):
+    def queries():
+        with CaptureQueriesContext(connection) as queries:
+            assert user_client.get(
+                URL, {'recipes_limit': 1}
+            ).status_code == 200
+        return len(queries)
+
+    queries()
+    few = queries()
+    Subscribe.objects.filter(author__in=authors[1:]).delete()
+
+    assert queries() == few
+
+
+@pytest.mark.parametrize('limit', ['x', '-1', '1.5'])
+def test_invalid_limit(user_client, authors, limit):
+    response = user_client.get(URL, {'recipes_limit': limit})
+
+    assert response.status_code == 400
+    assert 'recipes_limit' in response.json()
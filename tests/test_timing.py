@@ -0,0 +1,81 @@
+import pytest
+from loguru import logger
+from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def records():
+    """Записи loguru, попавшие в отдельный вывод теста."""
+    records = []
+    sink = logger.add(
+        lambda message: records.append(message.record), level='INFO'
+    )
+    yield records
+    logger.remove(sink)
+
+
+def stages(response):
+    return {
+        item.split(';')[0].strip()
+        for item in response['Server-Timing'].split(',')
+    }
+
+
+def test_disabled_by_default(settings, user_client, records):
+    assert not settings.SERVER_TIMING_SAMPLE_RATE
+    assert not settings.SERVER_TIMING_SLOW_MS
+
+    response = user_client.get('/api/recipes/')
+
+    assert response.status_code == 200, response.content
+    assert 'Server-Timing' not in response
+    assert not records
+
+
+def test_sampled_request(settings, user_client, records):
+    settings.SERVER_TIMING_SAMPLE_RATE = 1
+
+    response = user_client.get('/api/users/me/')
+
+    assert response.status_code == 200, response.content
+    assert {
+        'total', 'sql', 'auth', 'permissions', 'serializer'
+    } <= stages(response)
+    [record] = records
+    assert record['level'].name == 'INFO'
+    assert record['extra']['timing']
+    assert 'sql_trace' not in record['extra']
+
+
+def test_slow_request_logs_sql(settings, user_client, records):
+    settings.SERVER_TIMING_SLOW_MS = 0.001
+
+    response = user_client.get('/api/users/me/')
+
+    assert response.status_code == 200, response.content
+    assert 'Server-Timing' not in response
+    [record] = records
+    assert record['level'].name == 'WARNING'
+    assert record['extra']['sql_trace']
+
+
+def test_existing_sinks_are_kept(settings, user_client, records):
+    settings.SERVER_TIMING_SAMPLE_RATE = 1
+
+    user_client.get('/api/recipes/')
+    user_client.get('/api/recipes/')
+
+    assert len(records) == 2
+
+
+def test_drf_classes_are_not_patched(settings, user_client):
+    settings.SERVER_TIMING_SAMPLE_RATE = 1
+
+    user_client.get('/api/recipes/')
+
+    assert not hasattr(BaseSerializer.data.fget, '__wrapped__')
+    assert not hasattr(APIView.perform_authentication, '__wrapped__')
+    assert not hasattr(APIView.check_permissions, '__wrapped__')